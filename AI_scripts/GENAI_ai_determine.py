@@ -1,152 +1,97 @@
-import json
-import time
-from bs4 import BeautifulSoup
 import google.generativeai as genai
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-import threading
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Base_scripts"))
+from snapshot_store import read_stock_table, write_snapshot
+from classification_cache import ClassificationCache
+from llm_dispatch import dispatch, LLM_CONCURRENCY
+from llm_response import parse_response, format_items
+from sector_classifier import parse_flag, stream_descriptions
 
 # === Gemini Setup ===
 genai.configure(api_key="asdasdasdsad")
-model = genai.GenerativeModel("gemini-1.5-flash")
-
-INPUT_FILE = "Base_scripts/avanza_stock_data1.json"
-OUTPUT_FILE = "ai_companies.json"
-
-# === Thread-local WebDriver (so each thread gets its own browser) ===
-thread_local = threading.local()
-
-def get_driver():
-    if not hasattr(thread_local, "driver"):
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        thread_local.driver = webdriver.Chrome(options=options)
-    return thread_local.driver
-
-# === Scrape function using Selenium ===
-def scrape_company_description(order_book_id):
-    url = f"https://www.avanza.se/aktier/om-aktien.html/{order_book_id}"
-    driver = get_driver()
-
-    try:
-        print(f"🔍 Navigating to: {url}")
-        driver.get(url)
-
-        # ✅ Wait up to 10 seconds for <p class="separation"> to appear
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "separation"))
-        )
-
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        paragraphs = soup.find_all("p", class_="separation")
-        for p in paragraphs:
-            text = p.get_text(strip=True)
-            if len(text) > 50:
-                return text
-
-        # Optional fallback: any long <p>
-        for p in soup.find_all("p"):
-            text = p.get_text(strip=True)
-            if len(text) > 50:
-                return text
-
-    except TimeoutException:
-        print(f"❌ Timeout waiting for description at: {url}")
-    except Exception as e:
-        print(f"❌ Error scraping {url}: {e}")
-
-    return ""
-
-# === Multithreaded scraper ===
-def parallel_scrape_companies(data, max_workers=10):
-    descriptions = {}
-    company_info = {}
-
-    def worker(item):
-        name = item["name"]
-        order_book_id = item["orderBookId"]
-        desc = scrape_company_description(order_book_id)
-        return name, desc, item
+GEMINI_MODEL = "gemini-1.5-flash"
+model = genai.GenerativeModel(GEMINI_MODEL)
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(worker, item) for item in data]
+# Changing the template invalidates cached answers for it
+PROMPT_TEMPLATE = (
+    "Based on the following company descriptions, given as \"orderBookId | company name: description\", "
+    "respond ONLY in JSON format with structure {orderBookId: true/false} for whether the company "
+    "develops or builds AI solutions.\n\n"
+)
 
-        for future in as_completed(futures):
-            try:
-                name, desc, item = future.result()
-                if desc:
-                    descriptions[name] = desc
-                    company_info[name] = item
-            except Exception as e:
-                print(f"❌ Worker error: {e}")
-
-    return descriptions, company_info
+# Snapshot stems; snapshot_store picks the file format (.parquet / .json)
+INPUT_SNAPSHOT = "Base_scripts/avanza_stock_data1"
+OUTPUT_SNAPSHOT = "ai_companies"
 
 # === Batch classifier ===
-def batch_dict(data, batch_size=100):
-    items = list(data.items())
-    print(f"📦 Batching {len(items)} items into size {batch_size}...")
-    for i in range(0, len(items), batch_size):
-        yield dict(items[i:i + batch_size])
-
-def get_ai_flags_batched(descriptions):
+def call_gemini(batch, names):
+    prompt = PROMPT_TEMPLATE + format_items(batch, names)
+
+    response = model.generate_content(prompt)
+    # Keep only well-formed answers ("true"/"yes" count, as in the Ollama
+    # path); dispatch retries the rest
+    flags = {order_book_id: parse_flag(answer) for order_book_id, answer in parse_response(response.text).items()}
+    return {order_book_id: flag for order_book_id, flag in flags.items() if flag is not None}
+
+def get_ai_flags_batched(descriptions, names):
+    # `descriptions` is a {orderBookId: description} dict or a stream of
+    # (orderBookId, description) pairs. Only descriptions without a cached
+    # answer for this model and prompt are sent; batches are sized by token
+    # estimate and run concurrently while the stream is still arriving
+    cache = ClassificationCache()
     ai_flags = {}
-    print("🤖 Classifying companies as AI-related...")
-    for batch in batch_dict(descriptions, batch_size=100):
-        prompt = (
-            "Based on the following company descriptions, respond ONLY in JSON format "
-            "with structure {company name: true/false} for whether the company develops or builds AI solutions.\n\n"
-        )
-        for company, desc in batch.items():
-            prompt += f"{company}: {desc}\n"
-
-        try:
-            response = model.generate_content(prompt)
-            cleaned = response.text.strip().strip("```json").strip("```")
-            parsed = json.loads(cleaned)
-            ai_flags.update(parsed)
-        except Exception as e:
-            print(f"⚠️ Gemini classification failed: {e}")
-            continue
-
-        time.sleep(1)
+    items = descriptions.items() if isinstance(descriptions, dict) else descriptions
 
+    def uncached():
+        for order_book_id, desc in items:
+            cached, todo = cache.split(GEMINI_MODEL, PROMPT_TEMPLATE, {order_book_id: desc})
+            ai_flags.update(cached)
+            if todo:
+                yield order_book_id, desc
+
+    print("🤖 Classifying companies as AI-related...")
+    try:
+        ai_flags.update(dispatch(
+            uncached(),
+            lambda batch: call_gemini(batch, names),
+            on_batch_done=lambda batch, result: cache.store(GEMINI_MODEL, PROMPT_TEMPLATE, batch, result),
+            concurrency=LLM_CONCURRENCY
+        ))
+    finally:
+        cache.report()
+        cache.close()
     return ai_flags
 
 # === Main pipeline ===
 def main():
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = read_stock_table(INPUT_SNAPSHOT)
 
     print(f"📦 Loaded {len(data)} companies from input file")
 
-    # Scrape in parallel
-    descriptions, company_info = parallel_scrape_companies(data, max_workers=10)
+    # Classify descriptions with Gemini as the scrape delivers them
+    descriptions = {}
+    names = dict(zip(data.column("orderBookId"), data.column("name")))
+
+    def scraped():
+        for order_book_id, desc, item in stream_descriptions(data):
+            descriptions[order_book_id] = desc
+            yield order_book_id, desc
 
+    ai_flags = get_ai_flags_batched(scraped(), names)
     print(f"✅ Scraped {len(descriptions)} descriptions")
 
-    # Gemini classification
-    ai_flags = get_ai_flags_batched(descriptions)
-
-    # Combine data
-    final_output = []
-    for company_name, is_ai in ai_flags.items():
-        obj = company_info.get(company_name, {})
-        obj["ai_company"] = is_ai
-        obj["description"] = descriptions.get(company_name, "")
-        final_output.append(obj)
+    # Combine data, joined on orderBookId
+    rows = data.positions("orderBookId")
+    labeled = [order_book_id for order_book_id in ai_flags if order_book_id in descriptions]
+    final_output = data.take([rows[order_book_id] for order_book_id in labeled])
+    final_output.set_column("ai_company", [ai_flags[order_book_id] for order_book_id in labeled])
+    final_output.set_column("description", [descriptions.get(order_book_id, "") for order_book_id in labeled])
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(final_output, f, ensure_ascii=False, indent=2)
+    output_path = write_snapshot(final_output, OUTPUT_SNAPSHOT)
 
-    print(f"✅ Saved {len(final_output)} AI-labeled companies to {OUTPUT_FILE}")
+    print(f"✅ Saved {len(final_output)} AI-labeled companies to {output_path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,70 @@
+# classification_cache.py
+# Cache of LLM classification answers keyed by (model, prompt template,
+# description hash). Only new or changed descriptions, or a new model or
+# prompt, reach the LLM again. Shared by all classifiers.
+
+import hashlib
+import json
+import sqlite3
+
+from description_cache import description_hash
+
+CACHE_FILE = "classification_cache.sqlite"
+
+
+def template_version(template):
+    # Editing the prompt template gives a new version, so old answers are not reused
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+
+class ClassificationCache:
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS labels (
+                model TEXT NOT NULL,
+                template TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                label TEXT NOT NULL,
+                PRIMARY KEY (model, template, hash)
+            ) WITHOUT ROWID;
+        """)
+
+    def close(self):
+        self.db.close()
+
+    def split(self, model, template, descriptions):
+        # Split {key: description} into ({key: cached label}, {key: description to classify})
+        version = template_version(template)
+        cached, todo = {}, {}
+        for key, desc in descriptions.items():
+            row = self.db.execute(
+                "SELECT label FROM labels WHERE model = ? AND template = ? AND hash = ?",
+                (model, version, description_hash(desc))
+            ).fetchone()
+            if row is None:
+                todo[key] = desc
+            else:
+                cached[key] = json.loads(row[0])
+        self.hits += len(cached)
+        self.misses += len(todo)
+        return cached, todo
+
+    def store(self, model, template, descriptions, labels):
+        # Remember labels[key] for every key that has a description
+        version = template_version(template)
+        rows = [
+            (model, version, description_hash(descriptions[key]), json.dumps(label))
+            for key, label in labels.items() if key in descriptions
+        ]
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = (100 * self.hits / total) if total else 0.0
+        print(f"🗃 Classification cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate).")
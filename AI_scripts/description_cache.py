@@ -0,0 +1,106 @@
+# description_cache.py
+# Disk-backed cache of company descriptions shared by all classifiers, so a
+# re-run (or a run for a new sector) does not reload pages for companies
+# whose description is already known.
+#
+# Each entry stores the description, its content hash, when it was fetched
+# and when it was last used. Entries older than TTL_DAYS are refetched; once
+# the cache holds more than MAX_ENTRIES the least recently used are evicted.
+
+import hashlib
+import sqlite3
+import time
+
+CACHE_FILE = "description_cache.sqlite"
+TTL_DAYS = 30
+MAX_ENTRIES = 50000
+SQLITE_MAX_VARS = 500
+
+
+def description_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DescriptionCache:
+    def __init__(self, path=CACHE_FILE, ttl_days=TTL_DAYS, max_entries=MAX_ENTRIES, clock=time.time):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.clock = clock
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS descriptions (
+                orderBookId TEXT PRIMARY KEY,
+                description TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS descriptions_by_use ON descriptions (last_used);
+        """)
+
+    def close(self):
+        self.db.close()
+
+    def get_many(self, ids):
+        # {orderBookId: description} for the ids that are cached and fresh
+        now = self.clock()
+        ids = [str(i) for i in ids]
+        found = {}
+        for i in range(0, len(ids), SQLITE_MAX_VARS):
+            chunk = ids[i:i + SQLITE_MAX_VARS]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(self.db.execute(
+                f"SELECT orderBookId, description FROM descriptions "
+                f"WHERE orderBookId IN ({placeholders}) AND fetched_at >= ?",
+                chunk + [now - self.ttl]
+            ))
+        with self.db:
+            self.db.executemany("UPDATE descriptions SET last_used = ? WHERE orderBookId = ?",
+                                [(now, i) for i in found])
+        return found
+
+    def get(self, order_book_id):
+        return self.get_many([order_book_id]).get(str(order_book_id))
+
+    def hashes(self, ids):
+        # {orderBookId: content hash} for cached ids, fresh or not
+        ids = [str(i) for i in ids]
+        out = {}
+        for i in range(0, len(ids), SQLITE_MAX_VARS):
+            chunk = ids[i:i + SQLITE_MAX_VARS]
+            placeholders = ",".join("?" * len(chunk))
+            out.update(self.db.execute(
+                f"SELECT orderBookId, hash FROM descriptions WHERE orderBookId IN ({placeholders})", chunk))
+        return out
+
+    def put_many(self, descriptions):
+        # Store {orderBookId: description}; empty descriptions are not cached
+        now = self.clock()
+        rows = [(str(i), text, description_hash(text), now, now) for i, text in descriptions.items() if text]
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO descriptions VALUES (?, ?, ?, ?, ?)", rows)
+        self.evict()
+        return len(rows)
+
+    def invalidate(self, ids=None):
+        # Drop the given ids, or everything when ids is None
+        with self.db:
+            if ids is None:
+                self.db.execute("DELETE FROM descriptions")
+            else:
+                self.db.executemany("DELETE FROM descriptions WHERE orderBookId = ?", [(str(i),) for i in ids])
+
+    def evict(self):
+        # Remove the least recently used entries above max_entries
+        count = self.db.execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            with self.db:
+                self.db.execute(
+                    "DELETE FROM descriptions WHERE orderBookId IN "
+                    "(SELECT orderBookId FROM descriptions ORDER BY last_used LIMIT ?)", (excess,))
+        return max(excess, 0)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
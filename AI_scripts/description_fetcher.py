@@ -0,0 +1,279 @@
+# description_fetcher.py
+# Browser-free company description fetcher shared by the classifiers.
+# Descriptions come from the market-guide JSON, then from the page HTML, and
+# only if both fail from a headless Chrome (skipped with a warning when
+# selenium or Chrome is not available). Requests go through one pooled
+# client: aiohttp when installed, a requests.Session thread pool otherwise.
+# Descriptions already in the DescriptionCache are not fetched again.
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from description_cache import DescriptionCache
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# === Configuration ===
+DESCRIPTION_API = "https://www.avanza.se/_api/market-guide/stock/{}"
+PAGE_URL = "https://www.avanza.se/aktier/om-aktien.html/{}"
+MAX_CONCURRENCY = 100
+REQUEST_TIMEOUT = 15
+MIN_LENGTH = 50
+# Use a headless Chrome for companies the HTTP fetch could not describe
+SELENIUM_FALLBACK = True
+SELENIUM_WORKERS = 4
+# Reuse descriptions from description_cache.CACHE_FILE
+USE_CACHE = True
+HEADERS = {"User-Agent": "Mozilla/5.0", "Accept-Language": "sv-SE,sv;q=0.9"}
+
+
+# === Extraction ===
+def extract_from_api(data):
+    company = (data or {}).get("company") or {}
+    text = (company.get("description") or "").strip()
+    return text if len(text) > MIN_LENGTH else ""
+
+
+def extract_from_html(html):
+    soup = BeautifulSoup(html, "html.parser")
+    for p in soup.find_all("p", class_="separation"):
+        text = p.get_text(strip=True)
+        if len(text) > MIN_LENGTH:
+            return text
+
+    meta = soup.find("meta", attrs={"name": "description"}) or soup.find("meta", attrs={"property": "og:description"})
+    if meta and len(meta.get("content", "").strip()) > MIN_LENGTH:
+        return meta["content"].strip()
+
+    for p in soup.find_all("p"):
+        text = p.get_text(strip=True)
+        if len(text) > MIN_LENGTH:
+            return text
+    return ""
+
+
+# === aiohttp client ===
+async def _fetch_one_async(session, semaphore, order_book_id):
+    async with semaphore:
+        try:
+            async with session.get(DESCRIPTION_API.format(order_book_id)) as response:
+                if response.status == 200:
+                    text = extract_from_api(await response.json(content_type=None))
+                    if text:
+                        return text
+            async with session.get(PAGE_URL.format(order_book_id)) as response:
+                if response.status == 200:
+                    return extract_from_html(await response.text())
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"❌ Error fetching description for {order_book_id}: {e}")
+    return ""
+
+
+async def _fetch_all_async(ids, concurrency, on_result=None):
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS) as session:
+        async def one(order_book_id):
+            text = await _fetch_one_async(session, semaphore, order_book_id)
+            if text and on_result:
+                on_result(order_book_id, text)
+            return text
+
+        texts = await asyncio.gather(*[one(i) for i in ids])
+    return dict(zip(ids, texts))
+
+
+# === requests fallback client ===
+def create_session(pool_size=MAX_CONCURRENCY):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def _fetch_one(session, order_book_id):
+    try:
+        response = session.get(DESCRIPTION_API.format(order_book_id), timeout=REQUEST_TIMEOUT)
+        if response.status_code == 200:
+            text = extract_from_api(response.json())
+            if text:
+                return text
+        response = session.get(PAGE_URL.format(order_book_id), timeout=REQUEST_TIMEOUT)
+        if response.status_code == 200:
+            return extract_from_html(response.text)
+    except (requests.RequestException, ValueError) as e:
+        print(f"❌ Error fetching description for {order_book_id}: {e}")
+    return ""
+
+
+def _fetch_all_threaded(ids, concurrency, on_result=None):
+    session = create_session(concurrency)
+
+    def one(order_book_id):
+        text = _fetch_one(session, order_book_id)
+        if text and on_result:
+            on_result(order_book_id, text)
+        return text
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            texts = list(executor.map(one, ids))
+    finally:
+        session.close()
+    return dict(zip(ids, texts))
+
+
+# === Selenium fallback ===
+thread_local = threading.local()
+drivers = []
+drivers_lock = threading.Lock()
+
+
+class BrowserUnavailable(Exception):
+    # selenium is not installed or Chrome could not be started
+    pass
+
+
+def get_driver():
+    if not hasattr(thread_local, "driver"):
+        try:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.options import Options
+
+            options = Options()
+            options.add_argument("--headless")
+            options.add_argument("--no-sandbox")
+            options.add_argument("--disable-dev-shm-usage")
+            driver = webdriver.Chrome(options=options)
+        except Exception as e:
+            raise BrowserUnavailable(str(e) or type(e).__name__) from e
+        thread_local.driver = driver
+        with drivers_lock:
+            drivers.append(driver)
+    return thread_local.driver
+
+
+def quit_drivers():
+    with drivers_lock:
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        drivers.clear()
+
+
+def scrape_with_selenium(order_book_id):
+    # Raises BrowserUnavailable if no driver can be started; any error on
+    # the page itself only fails this company
+    driver = get_driver()
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
+
+    url = PAGE_URL.format(order_book_id)
+    try:
+        print(f"🔍 Scraping with browser: {url}")
+        driver.get(url)
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CLASS_NAME, "separation"))
+        )
+        return extract_from_html(driver.page_source)
+    except TimeoutException:
+        print(f"❌ Timeout: {url}")
+    except Exception as e:
+        print(f"❌ Error scraping {url}: {e}")
+    return ""
+
+
+# === Public API ===
+def fetch_descriptions(ids, concurrency=MAX_CONCURRENCY, selenium_fallback=SELENIUM_FALLBACK,
+                       use_cache=USE_CACHE, cache=None, on_result=None):
+    # {orderBookId: description}; companies without a description map to "".
+    # on_result(orderBookId, description) is called, possibly from worker
+    # threads, as soon as each description is known so callers can stream.
+    ids = [str(i) for i in dict.fromkeys(ids)]
+    if not ids:
+        return {}
+
+    own_cache = use_cache and cache is None
+    if own_cache:
+        cache = DescriptionCache()
+    try:
+        descriptions = cache.get_many(ids) if cache is not None else {}
+        todo = [i for i in ids if i not in descriptions]
+        print(f"🗃 {len(descriptions)} descriptions from cache, {len(todo)} to fetch.")
+        if on_result:
+            for order_book_id, text in descriptions.items():
+                on_result(order_book_id, text)
+
+        fetched = _fetch_uncached(todo, concurrency, selenium_fallback, on_result, cache)
+        descriptions.update(fetched)
+    finally:
+        if own_cache:
+            cache.close()
+    return descriptions
+
+
+def _fetch_uncached(ids, concurrency, selenium_fallback, on_result=None, cache=None):
+    if not ids:
+        return {}
+
+    if aiohttp is not None:
+        descriptions = asyncio.run(_fetch_all_async(ids, concurrency, on_result))
+    else:
+        descriptions = _fetch_all_threaded(ids, concurrency, on_result)
+    # Cache the HTTP results before the browser fallback, which can fail
+    if cache is not None:
+        cache.put_many(descriptions)
+
+    missing = [i for i in ids if not descriptions.get(i)]
+    if missing and selenium_fallback:
+        print(f"🌐 {len(missing)} descriptions not found over HTTP, trying the browser.")
+        scraped = _scrape_missing(missing, on_result)
+        if cache is not None:
+            cache.put_many(scraped)
+        descriptions.update(scraped)
+
+    return descriptions
+
+
+def _scrape_missing(ids, on_result=None):
+    # {orderBookId: description} from the browser; once a driver cannot be
+    # started the remaining companies are skipped
+    unavailable = []
+
+    def one(order_book_id):
+        if unavailable:
+            return ""
+        try:
+            return scrape_with_selenium(order_book_id)
+        except BrowserUnavailable as e:
+            unavailable.append(e)
+            return ""
+
+    scraped = {}
+    try:
+        with ThreadPoolExecutor(max_workers=SELENIUM_WORKERS) as executor:
+            for order_book_id, text in zip(ids, executor.map(one, ids)):
+                scraped[order_book_id] = text
+                if text and on_result:
+                    on_result(order_book_id, text)
+    finally:
+        quit_drivers()
+    if unavailable:
+        print(f"⚠️ Browser fallback unavailable ({unavailable[0]}), keeping the HTTP results.")
+    return scraped
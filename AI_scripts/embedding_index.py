@@ -0,0 +1,202 @@
+# embedding_index.py
+# Embedding-based pre-classifier for sector labels. Descriptions are embedded
+# once (Ollama embeddings) and the unit vectors are kept in a memory-mapped
+# float32 matrix on disk, keyed by description hash. A sector is a pair of
+# seed centroids (positive / negative exemplars); a company's margin for it
+# is one dot product. Clear margins are labeled directly and only the
+# uncertain band goes to the LLM. Labeling a new sector over the whole
+# universe is a single matrix-vector product.
+#
+# Layout:
+#   embeddings/vectors.f32   rows of DIM float32, appended; rows hashes.txt does
+#                            not list (crash between the two writes) are cut off
+#   embeddings/hashes.txt    description hash of row i on line i, appended
+#   embeddings/index.json    {"model", "dim"}, written once
+
+import json
+import os
+import sys
+
+import numpy as np
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Base_scripts"))
+from checkpoint import write_json_atomic
+from description_cache import description_hash
+
+# === Configuration ===
+EMBEDDING_DIR = "embeddings"
+OLLAMA_EMBED_URL = "http://localhost:11500/api/embed"
+EMBED_MODEL = "nomic-embed-text"
+EMBED_BATCH = 64
+EMBED_TIMEOUT = 120
+
+# Margin (similarity to positive seeds minus similarity to negative seeds)
+# above HIGH is labeled true, below LOW false, anything between goes to the
+# LLM. These are starting values, not yet calibrated against LLM labels,
+# which is why sector_classifier.USE_EMBEDDINGS is off by default.
+MARGIN_HIGH = 0.08
+MARGIN_LOW = -0.04
+
+# Optional {sector: {"positive": [...], "negative": [...]}} JSON file;
+# the sector definition itself is always a positive seed
+SEEDS_FILE = "sector_seeds.json"
+DEFAULT_NEGATIVES = [
+    "The company operates retail stores selling clothing and shoes.",
+    "The company is a real estate company that owns and manages commercial properties.",
+    "The company is a bank offering savings accounts, loans and payment services.",
+    "The company explores for and mines gold, copper and other metals.",
+    "The company produces and sells food products and beverages.",
+]
+
+
+def embed_texts(texts, session=None):
+    # Unit-length float32 vectors for `texts`, EMBED_BATCH per request
+    session = session or requests
+    vectors = []
+    for i in range(0, len(texts), EMBED_BATCH):
+        response = session.post(
+            OLLAMA_EMBED_URL,
+            json={"model": EMBED_MODEL, "input": texts[i:i + EMBED_BATCH]},
+            timeout=EMBED_TIMEOUT
+        )
+        response.raise_for_status()
+        vectors.extend(response.json()["embeddings"])
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def load_seeds(sectors, path=SEEDS_FILE):
+    seeds = {}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            seeds = json.load(f)
+    out = {}
+    for sector, meaning in sectors.items():
+        configured = seeds.get(sector, {})
+        out[sector] = {
+            "positive": [f"The company {meaning}."] + configured.get("positive", []),
+            "negative": configured.get("negative", DEFAULT_NEGATIVES),
+        }
+    return out
+
+
+class EmbeddingIndex:
+    def __init__(self, root=EMBEDDING_DIR, embed=embed_texts):
+        self.root = root
+        self.embed = embed
+        self.vectors_path = os.path.join(root, "vectors.f32")
+        self.hashes_path = os.path.join(root, "hashes.txt")
+        self.index_path = os.path.join(root, "index.json")
+        os.makedirs(root, exist_ok=True)
+
+        self.meta = {"model": EMBED_MODEL, "dim": None}
+        self.rows = {}  # {description hash: row}
+        self.hashes_size = 0  # bytes of complete lines in hashes.txt
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            # Vectors from another model are not comparable; start over
+            if meta.get("model") == EMBED_MODEL:
+                self.meta = {"model": EMBED_MODEL, "dim": meta.get("dim")}
+                self.rows = self._load_hashes()
+        self._matrix = None
+        self._directions = {}
+
+    # === Storage ===
+    def _load_hashes(self):
+        # Only complete lines count; a torn last line is cut off on the
+        # next append
+        rows = {}
+        if os.path.exists(self.hashes_path):
+            with open(self.hashes_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    rows[line.rstrip("\n")] = len(rows)
+                    self.hashes_size += len(line)
+        return rows
+
+    def matrix(self):
+        # All stored vectors as a read-only memory map
+        rows = len(self.rows)
+        if rows == 0:
+            return np.empty((0, self.meta["dim"] or 0), dtype=np.float32)
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                     shape=(rows, self.meta["dim"]))
+        return self._matrix
+
+    def add(self, descriptions):
+        # Embed and store descriptions not seen before. Returns
+        # {key: row} for every key in `descriptions`.
+        hashes = {key: description_hash(text) for key, text in descriptions.items()}
+        new = {}
+        for key, h in hashes.items():
+            if h not in self.rows and h not in new:
+                new[h] = descriptions[key]
+
+        if new:
+            vectors = self.embed(list(new.values()))
+            start = len(self.rows)
+            if start == 0:
+                # New index (or another model): header once, empty files
+                self.meta["dim"] = int(vectors.shape[1])
+                write_json_atomic(self.index_path, self.meta)
+            # Vectors first, then their hashes; anything either file holds
+            # beyond the listed rows (crash between the writes) is cut off,
+            # so row numbers and file offsets stay in step
+            self._append(self.vectors_path, start * self.meta["dim"] * 4,
+                         np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            if start == 0:
+                self.hashes_size = 0
+            lines = "".join(h + "\n" for h in new).encode("ascii")
+            self._append(self.hashes_path, self.hashes_size, lines)
+            self.hashes_size += len(lines)
+            for offset, h in enumerate(new):
+                self.rows[h] = start + offset
+
+        return {key: self.rows[h] for key, h in hashes.items()}
+
+    @staticmethod
+    def _append(path, size, data):
+        with open(path, "ab") as f:
+            f.truncate(size)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    # === Scoring ===
+    def direction(self, sector, seeds):
+        # Positive centroid minus negative centroid; margin = vector · direction
+        if sector not in self._directions:
+            positive = self.embed(seeds["positive"]).mean(axis=0)
+            negative = self.embed(seeds["negative"]).mean(axis=0)
+            self._directions[sector] = (positive - negative).astype(np.float32)
+        return self._directions[sector]
+
+    def margins(self, rows, sectors, seeds):
+        # {sector: margin array} for the given matrix rows
+        vectors = self.matrix()[np.asarray(rows, dtype=np.intp)]
+        return {sector: vectors @ self.direction(sector, seeds[sector]) for sector in sectors}
+
+    def pre_classify(self, descriptions, sectors, seeds=None, high=MARGIN_HIGH, low=MARGIN_LOW):
+        # Split {key: description} into ({key: {sector: bool}} for clear
+        # cases, {key: description} for the uncertain band)
+        seeds = seeds or load_seeds(sectors)
+        rows = self.add(descriptions)
+        keys = list(descriptions)
+        margins = self.margins([rows[k] for k in keys], sectors, seeds)
+
+        confident = np.ones(len(keys), dtype=bool)
+        for values in margins.values():
+            confident &= (values >= high) | (values <= low)
+
+        labels, uncertain = {}, {}
+        for i, key in enumerate(keys):
+            if confident[i]:
+                labels[key] = {sector: bool(margins[sector][i] >= high) for sector in sectors}
+            else:
+                uncertain[key] = descriptions[key]
+        return labels, uncertain
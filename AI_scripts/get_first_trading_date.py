@@ -1,20 +1,22 @@
-from datetime import datetime, timedelta
-import json
+import os
+import sys
+from datetime import date, timedelta
 
-with open("avanza_stock_data.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Base_scripts"))
+from snapshot_store import read_stock_table
+from stock_index import StockIndex
 
-recent_threshold = datetime.now() - timedelta(days=90)
+RECENT_DAYS = 90
+COLUMNS = ["name", "orderBookId", "firstTradingDate"]
 
-recent_companies = []
-for company in data:
-    first_date = company.get("firstTradingDate")
-    if first_date:
-        try:
-            first_date_dt = datetime.strptime(first_date, "%Y-%m-%d")
-            if first_date_dt >= recent_threshold:
-                recent_companies.append(company)
-        except Exception:
-            continue
+# Only the needed columns and the recent rows are read from the snapshot
+# (ISO dates compare as strings); firstTradingDate is then parsed once and
+# sorted, so further date queries are a binary search and a slice
+today = date.today()
+cutoff = today - timedelta(days=RECENT_DAYS)
+table = read_stock_table("avanza_stock_data", columns=COLUMNS,
+                         filters=[("firstTradingDate", ">=", cutoff.isoformat())])
+index = StockIndex(table)
+recent_companies = index.select(index.listed_within(RECENT_DAYS, today=today))
 
-print(f"🆕 Found {len(recent_companies)} newly listed companies (last 90 days).")
+print(f"🆕 Found {len(recent_companies)} newly listed companies (last {RECENT_DAYS} days).")
@@ -0,0 +1,118 @@
+# llm_dispatch.py
+# Streaming batcher for LLM classification. Items arrive one at a time (for
+# example straight from the description scraper), are packed into batches
+# by estimated token count, and up to LLM_CONCURRENCY batches are in flight
+# at once. Classification therefore overlaps scraping instead of waiting
+# for it to finish. Items the LLM did not answer are retried on their own.
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# === Defaults ===
+MAX_BATCH_TOKENS = 6000   # prompt budget per batch, descriptions only
+MAX_BATCH_ITEMS = 100
+LLM_CONCURRENCY = 4
+MAX_RETRIES = 2           # re-queues of unanswered items, each in smaller batches
+CHARS_PER_TOKEN = 4       # rough estimate for Swedish/English prose
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class TokenBatcher:
+    # Collects (key, text) items and hands out a batch once adding the next
+    # item would exceed max_tokens or the batch holds max_items
+    def __init__(self, max_tokens=MAX_BATCH_TOKENS, max_items=MAX_BATCH_ITEMS):
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self.items = {}
+        self.tokens = 0
+
+    def add(self, key, text):
+        # Returns a full batch ({key: text}) or None
+        cost = estimate_tokens(text)
+        full = None
+        if self.items and (self.tokens + cost > self.max_tokens or len(self.items) >= self.max_items):
+            full = self.flush()
+        self.items[key] = text
+        self.tokens += cost
+        return full
+
+    def flush(self):
+        batch = self.items or None
+        self.items = {}
+        self.tokens = 0
+        return batch
+
+
+def split_batch(batch, size):
+    items = list(batch.items())
+    return [dict(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+def dispatch(items, classify_batch, on_batch_done=None, concurrency=LLM_CONCURRENCY,
+             max_tokens=MAX_BATCH_TOKENS, max_items=MAX_BATCH_ITEMS, max_retries=MAX_RETRIES):
+    # Classify an iterable of (key, text) with classify_batch({key: text}),
+    # which returns {key: label}. on_batch_done(batch, labels) runs in the
+    # calling thread, so it may use objects that are not thread-safe (such as
+    # a sqlite connection). Keys missing from an answer (or a whole failed
+    # batch) are re-queued in batches half the size, up to max_retries times.
+    batcher = TokenBatcher(max_tokens, max_items)
+    labels = {}
+    pending = {}
+    retries = []
+
+    def harvest(futures):
+        for future in futures:
+            batch, attempt = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"⚠️ LLM batch of {len(batch)} failed: {e}")
+                result = {}
+
+            result = {key: label for key, label in result.items() if key in batch}
+            labels.update(result)
+            if result and on_batch_done:
+                on_batch_done(batch, result)
+
+            missing = {key: text for key, text in batch.items() if key not in result}
+            if not missing:
+                continue
+            if attempt < max_retries:
+                size = max(1, len(batch) // 2)
+                print(f"🔁 Re-queueing {len(missing)} unanswered items in batches of {size}")
+                retries.extend((part, attempt + 1) for part in split_batch(missing, size))
+            else:
+                print(f"⚠️ Giving up on {len(missing)} items after {attempt + 1} attempts")
+
+    def submit(executor, batch, attempt=0):
+        # Keep at most `concurrency` batches in flight
+        while len(pending) >= concurrency:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            harvest(done)
+        pending[executor.submit(classify_batch, batch)] = (batch, attempt)
+        print(f"🤖 Dispatched batch of {len(batch)} ({len(pending)} in flight)")
+
+    def submit_retries(executor):
+        while retries:
+            submit(executor, *retries.pop(0))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for key, text in items:
+            batch = batcher.add(key, text)
+            if batch:
+                submit(executor, batch)
+            harvest([f for f in list(pending) if f.done()])
+            submit_retries(executor)
+
+        batch = batcher.flush()
+        if batch:
+            submit(executor, batch)
+        while pending or retries:
+            submit_retries(executor)
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                harvest(done)
+
+    return labels
@@ -0,0 +1,56 @@
+# llm_response.py
+# Tolerant parsing of the JSON dictionaries the classifiers ask the LLM for.
+# A whole-document parse is tried first; if the JSON is broken, every
+# "key": value entry that still parses on its own is salvaged so one bad
+# entry does not throw away the rest of the batch.
+
+import json
+import re
+
+FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+# "key": true/false/null, a number, or a flat {...} object
+ENTRY = re.compile(
+    r'"((?:[^"\\]|\\.)*)"\s*:\s*(\{[^{}]*\}|true|false|null|-?\d+(?:\.\d+)?)',
+    re.IGNORECASE
+)
+PY_LITERALS = re.compile(r"\b(True|False|None)\b")
+JSON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def strip_fences(text):
+    match = FENCE.search(text)
+    return match.group(1).strip() if match else text.strip()
+
+
+def parse_response(raw_text):
+    # {key: value} from an LLM answer; empty dict if nothing can be recovered
+    text = strip_fences(raw_text or "")
+
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            parsed = json.loads(text[start:end + 1])
+            if isinstance(parsed, dict):
+                return {str(k): v for k, v in parsed.items()}
+        except json.JSONDecodeError:
+            pass
+
+    # Entries are matched left to right, so the keys inside a salvaged
+    # {...} value are consumed with it. Callers keep only keys they asked for.
+    salvaged = {}
+    for key, value in ENTRY.findall(text):
+        # LLMs often answer with Python-style True/False/None
+        if value.lower() in ("true", "false", "null"):
+            value = value.lower()
+        value = PY_LITERALS.sub(lambda m: JSON_LITERALS[m.group(1)], value)
+        try:
+            salvaged[key] = json.loads(value)
+        except json.JSONDecodeError:
+            continue
+    return salvaged
+
+
+def format_items(batch, names):
+    # One prompt line per item, keyed by orderBookId so answers join back
+    # to companies even if the LLM rewrites the name
+    return "".join(f"{key} | {names.get(key, '')}: {desc}\n" for key, desc in batch.items())
@@ -0,0 +1,189 @@
+# news_crawler.py
+# Pooled, concurrent crawler for Di telegrams, shared by the news scripts.
+# Pages are fetched over keep-alive connections with a per-host concurrency
+# limit and timeouts: aiohttp when installed, a requests.Session thread pool
+# otherwise. BASE_URL can point at a local HTTP server serving fixture pages.
+# With a NewsIndex, list pages are polled conditionally (ETag /
+# If-Modified-Since) and telegrams processed before are skipped. Telegram
+# pages are kept as raw bytes and run through a TelegramFilter before any
+# HTML parsing.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from telegram_filter import TelegramFilter, KEYWORDS
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# === Configuration ===
+BASE_URL = "https://www.di.se"
+LIST_PATH = "/bors/aktier/aza-1294/nyheter/"
+MAX_CONCURRENCY = 20
+PER_HOST_LIMIT = 8
+REQUEST_TIMEOUT = 15
+HEADERS = {"User-Agent": "Mozilla/5.0", "Accept-Language": "sv-SE,sv;q=0.9"}
+# Telegram pages start the article at this class; the keyword scan starts here
+HEADLINE_MARKER = b"telegram-page__headline"
+
+
+# === Parsing ===
+def parse_telegram_links(html, base_url=BASE_URL):
+    soup = BeautifulSoup(html, "html.parser")
+    return sorted({
+        base_url + a["href"]
+        for a in soup.find_all("a", href=True)
+        if "/bors/telegram/" in a["href"]
+    })
+
+
+def parse_telegram(html):
+    # Headline + text of a telegram page, or None if the page has neither
+    soup = BeautifulSoup(html, "html.parser")
+    text_div = soup.find("div", class_="telegram-page__text")
+    headline_div = soup.find("div", class_="telegram-page__headline")
+
+    if not text_div or not headline_div:
+        return None
+    return headline_div.get_text(strip=True) + "\n" + text_div.get_text(strip=True)
+
+
+# === Sessions ===
+def create_session(pool_size=PER_HOST_LIMIT):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+# === Telegram list ===
+def scrape_all_telegram_urls(base_url=BASE_URL, list_path=LIST_PATH, session=None, index=None):
+    list_url = base_url + list_path
+    session = session or create_session()
+    headers = index.conditional_headers(list_url) if index else {}
+    try:
+        response = session.get(list_url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304 and index:
+            print("💤 Telegram list unchanged since the last poll.")
+            return parse_telegram_links(index.cached_body(list_url) or "", base_url)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"❌ Failed to fetch telegram list page: {e}")
+        return []
+
+    if index:
+        index.store_page(list_url, response.text,
+                         response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    telegram_links = parse_telegram_links(response.text, base_url)
+    print(f"🔗 Found {len(telegram_links)} unique telegram links.")
+    return telegram_links
+
+
+# === Concurrent page fetch ===
+async def _fetch_async(session, url):
+    try:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"❌ Failed to fetch {url}: {e}")
+        return None
+
+
+async def _fetch_all_async(urls, concurrency, per_host):
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS) as session:
+        pages = await asyncio.gather(*[_fetch_async(session, url) for url in urls])
+    return dict(zip(urls, pages))
+
+
+def fetch_page(session, url):
+    try:
+        response = session.get(url, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+    except requests.RequestException as e:
+        print(f"❌ Failed to fetch {url}: {e}")
+        return None
+
+
+def _fetch_all_threaded(urls, concurrency, per_host):
+    # One pooled session; the pool size caps connections per host
+    session = create_session(per_host)
+    try:
+        with ThreadPoolExecutor(max_workers=min(concurrency, per_host)) as executor:
+            pages = list(executor.map(lambda url: fetch_page(session, url), urls))
+    finally:
+        session.close()
+    return dict(zip(urls, pages))
+
+
+def fetch_pages(urls, concurrency=MAX_CONCURRENCY, per_host=PER_HOST_LIMIT):
+    # {url: raw page bytes or None}
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    if aiohttp is not None:
+        return asyncio.run(_fetch_all_async(urls, concurrency, per_host))
+    return _fetch_all_threaded(urls, concurrency, per_host)
+
+
+# === Public API ===
+def match_telegram(raw, telegram_filter):
+    # Telegram content if it matches the filter, else None. The raw bytes are
+    # checked first, from the headline on (the navigation and scripts before
+    # it mention "köp", "sälj", ... on every page), so pages without any
+    # match are never parsed.
+    data = raw.encode("utf-8") if isinstance(raw, str) else raw
+    start = data.find(HEADLINE_MARKER)
+    if start < 0 or not telegram_filter.matches(data, start):
+        return None
+    content = parse_telegram(raw)
+    if content and telegram_filter.matches(content):
+        return content
+    return None
+
+
+def crawl_telegrams(urls, keywords=KEYWORDS, concurrency=MAX_CONCURRENCY, per_host=PER_HOST_LIMIT,
+                    index=None, telegram_filter=None):
+    # [(url, content)] for the telegrams whose content matches `keywords`
+    # (one keyword or a list) or the given TelegramFilter.
+    # With an index, only unseen urls are fetched and the ones that do not
+    # match are marked seen right away; the caller marks the matches seen
+    # once they have been processed.
+    if index:
+        new_urls = index.filter_new(urls)
+        print(f"🆕 {len(new_urls)} new telegrams, {len(urls) - len(new_urls)} already processed.")
+        urls = new_urls
+
+    telegram_filter = telegram_filter or TelegramFilter(keywords)
+    pages = fetch_pages(urls, concurrency, per_host)
+    telegrams = []
+    skipped = {}
+    for url in urls:
+        raw = pages.get(url)
+        if not raw:
+            continue
+        content = match_telegram(raw, telegram_filter)
+        if content:
+            telegrams.append((url, content))
+        else:
+            skipped[url] = raw.decode("utf-8", "ignore")
+    if index:
+        index.mark_seen(skipped)
+    return telegrams
+
+
+def extract_telegram_data(url, keywords=KEYWORDS):
+    # Single telegram; content if it matches `keywords`, else None
+    telegrams = crawl_telegrams([url], keywords)
+    return telegrams[0][1] if telegrams else None
@@ -0,0 +1,90 @@
+# news_index.py
+# Persistent record of processed telegrams and list-page validators, so a
+# polling run only downloads and sends new telegrams to the LLM, and an
+# unchanged list page costs a single 304 response.
+
+import hashlib
+import sqlite3
+import threading
+import time
+
+INDEX_FILE = "seen_telegrams.sqlite"
+SQLITE_MAX_VARS = 500
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class NewsIndex:
+    def __init__(self, path=INDEX_FILE, clock=time.time):
+        self.path = path
+        self.clock = clock
+        # Shared by crawler threads; every access goes through self.lock
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS telegrams (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                seen_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS list_pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+        """)
+
+    def close(self):
+        self.db.close()
+
+    # === Telegrams ===
+    def filter_new(self, urls):
+        # The urls (in order) that have not been processed before
+        urls = list(dict.fromkeys(urls))
+        seen = set()
+        with self.lock:
+            for i in range(0, len(urls), SQLITE_MAX_VARS):
+                chunk = urls[i:i + SQLITE_MAX_VARS]
+                placeholders = ",".join("?" * len(chunk))
+                seen.update(row[0] for row in self.db.execute(
+                    f"SELECT url FROM telegrams WHERE url IN ({placeholders})", chunk))
+        return [url for url in urls if url not in seen]
+
+    def mark_seen(self, contents):
+        # Record {url: content} as processed
+        now = self.clock()
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO telegrams VALUES (?, ?, ?)",
+                [(url, content_hash(content or ""), now) for url, content in contents.items()]
+            )
+
+    # === List pages ===
+    def conditional_headers(self, url):
+        # If-None-Match / If-Modified-Since for the last stored copy of `url`
+        with self.lock:
+            row = self.db.execute("SELECT etag, last_modified FROM list_pages WHERE url = ?", (url,)).fetchone()
+        headers = {}
+        if row:
+            etag, last_modified = row
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def cached_body(self, url):
+        with self.lock:
+            row = self.db.execute("SELECT body FROM list_pages WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def store_page(self, url, body, etag=None, last_modified=None):
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO list_pages VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, self.clock())
+            )
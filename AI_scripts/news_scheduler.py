@@ -0,0 +1,138 @@
+# news_scheduler.py
+# News ingestion across the whole tracked universe. Every company in
+# avanza_all_companies gets a news list page (news_sources.json or
+# NEWS_PATH_TEMPLATE); companies are crawled in order of hypePotential from
+# the latest avanza_stock_data snapshot, concurrently, until a global
+# request budget or time window runs out.
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Base_scripts"))
+from fetch_engine import TokenBucket
+from scoring import to_columns, top_k
+from snapshot_store import read_stock_table
+from stock_model import StockTable
+from news_crawler import (BASE_URL, PER_HOST_LIMIT, create_session,
+                          fetch_page, match_telegram, scrape_all_telegram_urls)
+from telegram_filter import TelegramFilter, KEYWORDS
+
+# === Configuration ===
+COMPANIES_SNAPSHOT = "avanza_all_companies"
+STOCK_SNAPSHOT = "avanza_stock_data"
+# {orderBookId: list page path}; ids not listed use NEWS_PATH_TEMPLATE
+NEWS_SOURCES_FILE = "news_sources.json"
+NEWS_PATH_TEMPLATE = "/bors/aktier/aza-{orderBookId}/nyheter/"
+
+REQUEST_BUDGET = 2000      # list pages + telegram pages per run
+TIME_BUDGET = 600          # seconds per run
+REQUESTS_PER_SECOND = 5.0
+WORKERS = PER_HOST_LIMIT
+
+
+# === Request budget shared by all workers ===
+class RequestBudget:
+    def __init__(self, requests=REQUEST_BUDGET, seconds=TIME_BUDGET, clock=time.monotonic):
+        self.remaining = requests
+        self.clock = clock
+        self.deadline = clock() + seconds
+        self.lock = threading.Lock()
+
+    def spend(self, n=1):
+        # True if n more requests fit in the budget and the time window
+        with self.lock:
+            if self.remaining < n or self.clock() >= self.deadline:
+                return False
+            self.remaining -= n
+            return True
+
+
+# === Sources and priority ===
+def load_news_sources(path=NEWS_SOURCES_FILE):
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return {str(k): v for k, v in json.load(f).items()}
+    return {}
+
+
+def news_path(order_book_id, sources):
+    return sources.get(str(order_book_id)) or NEWS_PATH_TEMPLATE.format(orderBookId=order_book_id)
+
+
+def prioritized_companies(companies_snapshot=COMPANIES_SNAPSHOT, stock_snapshot=STOCK_SNAPSHOT):
+    # Tracked companies, highest hypePotential first; unscored ones last
+    companies = read_stock_table(companies_snapshot, columns=["name", "orderBookId"])
+    try:
+        stocks = read_stock_table(stock_snapshot, columns=["orderBookId", "hypePotential"])
+    except FileNotFoundError:
+        stocks = StockTable()
+    hype = dict(zip(stocks.column("orderBookId"), stocks.column("hypePotential")))
+    companies.set_column("hypePotential", [hype.get(i) for i in companies.column("orderBookId")])
+
+    scores = to_columns(companies, ["hypePotential"])["hypePotential"]
+    ranked = top_k(scores, len(companies))
+    ranked_set = set(ranked.tolist())
+    order = ranked.tolist() + [i for i in range(len(companies)) if i not in ranked_set]
+    return [companies[i] for i in order]
+
+
+# === Crawl ===
+def crawl_universe(companies, keywords=KEYWORDS, base_url=BASE_URL, index=None,
+                   budget=None, bucket=None, workers=WORKERS, sources=None, telegram_filter=None):
+    # [(company, url, content)] for new telegrams matching `keywords` (or
+    # telegram_filter), crawled in the given (priority) order within the
+    # request budget
+    telegram_filter = telegram_filter or TelegramFilter(keywords)
+    budget = budget or RequestBudget()
+    bucket = bucket or TokenBucket(REQUESTS_PER_SECOND)
+    sources = load_news_sources() if sources is None else sources
+    session = create_session(workers)
+    claimed = set()
+    claimed_lock = threading.Lock()
+
+    def crawl_company(company):
+        if not budget.spend():
+            return []
+        bucket.acquire()
+        urls = scrape_all_telegram_urls(base_url, news_path(company["orderBookId"], sources), session, index)
+        if index:
+            urls = index.filter_new(urls)
+
+        found, skipped = [], {}
+        for url in urls:
+            # The same telegram can be listed under several companies
+            with claimed_lock:
+                if url in claimed:
+                    continue
+                claimed.add(url)
+            if not budget.spend():
+                break
+            bucket.acquire()
+            raw = fetch_page(session, url)
+            if not raw:
+                continue
+            content = match_telegram(raw, telegram_filter)
+            if content:
+                found.append((company, url, content))
+            else:
+                skipped[url] = raw.decode("utf-8", "ignore")
+        if index:
+            index.mark_seen(skipped)
+        return found
+
+    try:
+        # The executor starts companies in submission order, so the highest
+        # priority names are crawled first when the budget runs short
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(crawl_company, companies))
+    finally:
+        session.close()
+
+    telegrams = [t for company_results in results for t in company_results]
+    print(f"📰 Crawled news for the universe: {len(telegrams)} matching telegrams, "
+          f"{budget.remaining} requests left in the budget.")
+    return telegrams
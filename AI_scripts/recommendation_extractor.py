@@ -0,0 +1,207 @@
+# recommendation_extractor.py
+# Extracts broker recommendations from news telegrams with Ollama. Telegrams
+# are packed into context-sized prompts (llm_dispatch.TokenBatcher), several
+# prompts run at once, and each answer is streamed: records are parsed as
+# soon as their closing brace arrives and saved to the recommendations table
+# straight away. A prompt whose answer is cut off or contains a broken
+# record fails as a whole, so its telegrams are retried rather than marked
+# as processed.
+
+import json
+import sqlite3
+import threading
+import time
+
+import requests
+
+from llm_dispatch import dispatch
+
+# === Configuration ===
+OLLAMA_URL = "http://localhost:11500/api/generate"
+OLLAMA_MODEL = "gemma3"
+OLLAMA_TIMEOUT = 300          # seconds without a streamed chunk
+MAX_PROMPT_TOKENS = 3000      # telegram text per prompt
+MAX_TELEGRAMS_PER_PROMPT = 30
+CONCURRENCY = 2
+STORE_FILE = "recommendations.sqlite"
+
+PROMPT = (
+    "You are a financial analyst assistant. Read the following news telegrams and extract company recommendation data. "
+    "Return ONLY a valid JSON structure like this:\n\n"
+    "[{\"company\": \"...\", \"url\": \"...\", \"motivation\": \"...\", \"brokername\": \"...\", \"fame-level\": \"high\", \"recommendation\": \"buy\"}]\n\n"
+    "- Estimate the fame-level of the broker (based on its popularity in Sweden).\n"
+    "- Extract the company name from the text if possible.\n"
+    "- Extract the broker name if available.\n"
+    "- Copy the url of the telegram each record comes from.\n"
+    "- Generate a short motivation based on the content.\n"
+    "- Only return VALID JSON. No explanations or extra text.\n\n"
+)
+
+FIELDS = ["company", "url", "motivation", "brokername", "fame-level", "recommendation"]
+
+
+# === Incremental parsing ===
+class RecordStream:
+    # Feed streamed text in any chunk size; complete top-level {...} objects
+    # are returned as soon as their closing brace arrives
+    def __init__(self):
+        self.buffer = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.skipped = 0
+
+    def feed(self, text):
+        records = []
+        for char in text:
+            if self.depth:
+                self.buffer.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"' and self.depth:
+                self.in_string = True
+            elif char == "{":
+                if self.depth == 0:
+                    self.buffer = [char]
+                self.depth += 1
+            elif char == "}" and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        record = json.loads("".join(self.buffer))
+                        if isinstance(record, dict):
+                            records.append(record)
+                    except json.JSONDecodeError:
+                        print("⚠️ Skipping unparseable record in LLM stream")
+                        self.skipped += 1
+                    self.buffer = []
+        return records
+
+    def close(self):
+        # Call at the end of the answer; raises if it stopped inside a
+        # record or contained records that could not be parsed
+        if self.depth:
+            raise ValueError("LLM answer ended inside a record")
+        if self.skipped:
+            raise ValueError(f"{self.skipped} unparseable records in LLM answer")
+
+
+# === Recommendations table ===
+class RecommendationStore:
+    def __init__(self, path=STORE_FILE, clock=time.time):
+        self.clock = clock
+        # Written from the dispatch workers; every access goes through self.lock
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS recommendations (
+                url TEXT NOT NULL,
+                company TEXT NOT NULL,
+                motivation TEXT,
+                brokername TEXT,
+                fame_level TEXT,
+                recommendation TEXT,
+                extracted_at REAL NOT NULL,
+                PRIMARY KEY (url, company)
+            );
+        """)
+
+    def close(self):
+        self.db.close()
+
+    def save(self, record):
+        row = (
+            str(record.get("url") or ""),
+            str(record.get("company") or ""),
+            record.get("motivation"),
+            record.get("brokername"),
+            record.get("fame-level"),
+            (record.get("recommendation") or "").lower() or None,
+            self.clock(),
+        )
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO recommendations VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+
+    def all(self):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT company, url, motivation, brokername, fame_level, recommendation FROM recommendations"
+            ).fetchall()
+        return [dict(zip(FIELDS, row)) for row in rows]
+
+
+# === Streaming Ollama call ===
+ollama_session = requests.Session()
+
+
+def stream_ollama(prompt, on_record):
+    # Stream one generation and hand every complete record to on_record.
+    # Returns the number of records; raises on HTTP errors and on answers
+    # that are cut off or unparseable.
+    parser = RecordStream()
+    count = 0
+    finished = False
+    with ollama_session.post(
+        OLLAMA_URL,
+        json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": True},
+        stream=True,
+        timeout=OLLAMA_TIMEOUT
+    ) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            for record in parser.feed(chunk.get("response", "")):
+                on_record(record)
+                count += 1
+            if chunk.get("done"):
+                finished = True
+                break
+    if not finished:
+        raise ValueError("Ollama stream ended before the answer was done")
+    parser.close()
+    return count
+
+
+def extract_chunk(chunk, store, stream=stream_ollama):
+    # chunk: {url: telegram text}. Returns {url: number of records} so
+    # dispatch sees every telegram of a finished prompt as answered.
+    # stream(prompt, on_record) runs the model (see stream_ollama).
+    counts = {url: 0 for url in chunk}
+
+    def on_record(record):
+        store.save(record)
+        url = record.get("url")
+        if url in counts:
+            counts[url] += 1
+        print(f"💡 {record.get('company')}: {record.get('recommendation')} ({record.get('brokername')})")
+
+    stream(PROMPT + "\n".join(chunk.values()), on_record)
+    return counts
+
+
+def extract_recommendations(telegrams, store=None, concurrency=CONCURRENCY, max_tokens=MAX_PROMPT_TOKENS,
+                            stream=stream_ollama):
+    # telegrams: [(url, text)]. Saves recommendations as they stream in and
+    # returns the urls whose prompt completed and parsed.
+    own_store = store is None
+    store = store or RecommendationStore()
+    try:
+        done = dispatch(
+            telegrams,
+            lambda chunk: extract_chunk(chunk, store, stream),
+            concurrency=concurrency,
+            max_tokens=max_tokens,
+            max_items=MAX_TELEGRAMS_PER_PROMPT
+        )
+    finally:
+        if own_store:
+            store.close()
+    print(f"✅ Extracted {sum(done.values())} recommendations from {len(done)} telegrams.")
+    return set(done)
@@ -0,0 +1,282 @@
+# sector_classifier.py
+# One classification pipeline for any number of sectors. Descriptions are
+# scraped once, every batch asks the LLM for all sector labels in a single
+# structured answer, and the result is one merged label table with a
+# <sector>_company flag per sector. Descriptions stream from the scraper
+# into token-sized batches that are classified while scraping continues.
+# With USE_EMBEDDINGS, clear cases are labeled by embedding similarity and
+# only the uncertain ones reach the LLM.
+# To run: `python sector_classifier.py`
+
+import queue
+import threading
+import requests
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Base_scripts"))
+from snapshot_store import read_stock_table, write_snapshot
+from description_fetcher import fetch_descriptions, MAX_CONCURRENCY
+from classification_cache import ClassificationCache
+from llm_dispatch import dispatch, LLM_CONCURRENCY, MAX_BATCH_TOKENS
+from llm_response import parse_response, format_items
+from embedding_index import EmbeddingIndex, EMBED_BATCH, load_seeds
+
+# === Configuration ===
+# Snapshot stems; snapshot_store picks the file format (.parquet / .json)
+INPUT_SNAPSHOT = "avanza_stock_data1"
+OUTPUT_SNAPSHOT = "sector_companies"
+
+OLLAMA_URL = "http://localhost:11500/api/generate"
+OLLAMA_MODEL = "gemma3"  # or llama3, phi3, etc.
+OLLAMA_TIMEOUT = 120
+
+# Sector label -> what the company has to do to get it. Adding a sector
+# adds a flag to the same LLM pass instead of a whole new run.
+SECTORS = {
+    "ai": "actively builds or develops AI technologies",
+    "healthcare": "actively builds or develops healthcare technologies",
+    "defense": "develops or manufactures defense or military products",
+}
+
+BATCH_SIZE = 100  # upper bound; batches are sized by MAX_BATCH_TOKENS
+
+# Label obvious cases with the embedding index (embedding_index.py) and
+# send only the uncertain band to the LLM. Off until MARGIN_HIGH/MARGIN_LOW
+# have been checked against LLM labels, since embedding labels replace LLM
+# answers without any further check
+USE_EMBEDDINGS = False
+
+
+def flag_column(sector):
+    return f"{sector}_company"
+
+
+def build_prompt_template(sectors):
+    # The template lists the sectors, so adding or rewording a sector gives a
+    # new template version in the classification cache
+    lines = [
+        "You are an industry analyst. Each company below is given as "
+        "\"orderBookId | company name: description\". Decide for every label whether it applies:",
+    ]
+    for sector, meaning in sectors.items():
+        lines.append(f"- {sector}: the company {meaning}")
+    example = ", ".join(f'"{sector}": true/false' for sector in sectors)
+    lines.append(
+        "Respond ONLY with a JSON dictionary keyed by orderBookId of the form "
+        f"{{orderBookId: {{{example}}}}}.\n\n"
+    )
+    return "\n".join(lines)
+
+
+# === Streaming scrape ===
+def stream_descriptions(data, max_workers=MAX_CONCURRENCY):
+    # Yield (orderBookId, description, item) as soon as each description is known.
+    # Fetching runs in a background thread; see description_fetcher.
+    by_id = {str(item["orderBookId"]): item for item in data}
+    results = queue.Queue()
+    done = object()
+    errors = []
+
+    def produce():
+        try:
+            fetch_descriptions(list(by_id), concurrency=max_workers,
+                               on_result=lambda order_book_id, text: results.put((order_book_id, text)))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            results.put(done)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    while True:
+        entry = results.get()
+        if entry is done:
+            break
+        order_book_id, text = entry
+        item = by_id.get(order_book_id)
+        if item:
+            yield order_book_id, text, item
+    thread.join()
+    if errors:
+        raise errors[0]
+
+
+def parallel_scrape(data, max_workers=MAX_CONCURRENCY):
+    # ({orderBookId: description}, {orderBookId: item})
+    descriptions = {}
+    company_info = {}
+    for order_book_id, desc, item in stream_descriptions(data, max_workers):
+        descriptions[order_book_id] = desc
+        company_info[order_book_id] = item
+    return descriptions, company_info
+
+
+FLAG_WORDS = {"true": True, "yes": True, "false": False, "no": False}
+
+
+def parse_flag(value):
+    # True/False for a JSON bool or an explicit "true"/"false"/"yes"/"no";
+    # None for anything else
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return FLAG_WORDS.get(value.strip().lower())
+    return None
+
+
+def normalize_labels(answer, sectors):
+    # {sector: bool} from one company's answer; unknown labels are dropped.
+    # None if any requested sector is missing or unreadable, so the item is
+    # asked again instead of being cached with gaps.
+    if len(sectors) == 1 and not isinstance(answer, dict):
+        answer = {next(iter(sectors)): answer}
+    if not isinstance(answer, dict):
+        return None
+    labels = {sector: parse_flag(answer.get(sector)) for sector in sectors}
+    if any(flag is None for flag in labels.values()):
+        return None
+    return labels
+
+
+# === Call Ollama to classify ===
+ollama_session = requests.Session()
+
+
+def call_ollama(template, batch, sectors, names):
+    # Classify one batch ({orderBookId: description}); raises on HTTP errors.
+    # Entries that cannot be parsed are left out and retried by dispatch.
+    prompt = template + format_items(batch, names)
+
+    response = ollama_session.post(
+        OLLAMA_URL,
+        json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False},
+        timeout=OLLAMA_TIMEOUT
+    )
+    response.raise_for_status()
+    raw_text = response.json().get("response", "")
+    print(f"📬 LLM Response received for {len(batch)} companies.")
+    labels = {}
+    for order_book_id, answer in parse_response(raw_text).items():
+        normalized = normalize_labels(answer, sectors)
+        if order_book_id in batch and normalized is not None:
+            labels[order_book_id] = normalized
+    return labels
+
+
+def embedding_prefilter(items, sectors, labels):
+    # Pass through only the (orderBookId, description) pairs the embedding
+    # index is unsure about; clear cases go straight into `labels`. Falls
+    # back to sending everything if embeddings are unavailable.
+    try:
+        index = EmbeddingIndex()
+        seeds = load_seeds(sectors)
+    except Exception as e:
+        print(f"⚠️ Embedding index unavailable ({e}), sending everything to the LLM.")
+        yield from items
+        return
+
+    stats = {"embedded": 0, "uncertain": 0}
+
+    def flush(chunk):
+        try:
+            confident, uncertain = index.pre_classify(chunk, sectors, seeds)
+        except Exception as e:
+            print(f"⚠️ Embedding failed ({e}), sending {len(chunk)} companies to the LLM.")
+            confident, uncertain = {}, chunk
+        labels.update(confident)
+        stats["embedded"] += len(chunk)
+        stats["uncertain"] += len(uncertain)
+        return list(uncertain.items())
+
+    chunk = {}
+    for order_book_id, desc in items:
+        chunk[order_book_id] = desc
+        if len(chunk) >= EMBED_BATCH:
+            yield from flush(chunk)
+            chunk = {}
+    if chunk:
+        yield from flush(chunk)
+
+    print(f"🧭 Embeddings labeled {stats['embedded'] - stats['uncertain']} of {stats['embedded']} "
+          f"companies; {stats['uncertain']} sent to the LLM.")
+
+
+def classify_with_ollama(descriptions, sectors=SECTORS, names=None, concurrency=LLM_CONCURRENCY,
+                         max_tokens=MAX_BATCH_TOKENS, use_embeddings=USE_EMBEDDINGS):
+    # {orderBookId: {sector: bool}} for all sectors in one pass.
+    # `descriptions` is a {orderBookId: description} dict or a stream of
+    # (orderBookId, description) pairs; `names` maps orderBookId to the
+    # company name shown in the prompt. Only descriptions without a cached
+    # answer for this model and prompt are sent, up to `concurrency` batches
+    # at once; with use_embeddings only those the embedding index cannot
+    # label confidently.
+    template = build_prompt_template(sectors)
+    cache = ClassificationCache()
+    names = {} if names is None else names
+    labels = {}
+    items = descriptions.items() if isinstance(descriptions, dict) else descriptions
+
+    def uncached():
+        for order_book_id, desc in items:
+            cached, todo = cache.split(OLLAMA_MODEL, template, {order_book_id: desc})
+            labels.update(cached)
+            if todo:
+                yield order_book_id, desc
+
+    todo = embedding_prefilter(uncached(), sectors, labels) if use_embeddings else uncached()
+
+    try:
+        labels.update(dispatch(
+            todo,
+            lambda batch: call_ollama(template, batch, sectors, names),
+            on_batch_done=lambda batch, result: cache.store(OLLAMA_MODEL, template, batch, result),
+            concurrency=concurrency,
+            max_tokens=max_tokens,
+            max_items=BATCH_SIZE
+        ))
+    finally:
+        cache.report()
+        cache.close()
+    return labels
+
+
+# === Main execution ===
+def run(sectors=SECTORS, input_snapshot=INPUT_SNAPSHOT, output_snapshot=OUTPUT_SNAPSHOT):
+    data = read_stock_table(input_snapshot)
+
+    print(f"📦 Loaded {len(data)} companies, labeling {', '.join(sectors)}")
+
+    # Scrape descriptions once for all sectors and classify them as they
+    # arrive, in one LLM pass for all sectors
+    descriptions = {}
+    names = dict(zip(data.column("orderBookId"), data.column("name")))
+
+    def scraped():
+        for order_book_id, desc, item in stream_descriptions(data):
+            descriptions[order_book_id] = desc
+            yield order_book_id, desc
+
+    labels = classify_with_ollama(scraped(), sectors, names)
+    print(f"✅ Scraped {len(descriptions)} company descriptions")
+
+    # Merge results into one label table, joined on orderBookId: the labeled
+    # rows of the input table plus one flag column per sector
+    rows = data.positions("orderBookId")
+    labeled = [order_book_id for order_book_id in labels if order_book_id in descriptions]
+    final_output = data.take([rows[order_book_id] for order_book_id in labeled])
+    for sector in sectors:
+        final_output.set_column(flag_column(sector), [labels[order_book_id].get(sector) for order_book_id in labeled])
+    final_output.set_column("description", [descriptions[order_book_id] for order_book_id in labeled])
+
+    output_path = write_snapshot(final_output, output_snapshot)
+
+    print(f"✅ Saved {len(final_output)} labeled companies to {output_path}")
+    return output_path
+
+
+def main():
+    run()
+
+if __name__ == "__main__":
+    main()
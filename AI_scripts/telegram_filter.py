@@ -0,0 +1,70 @@
+# telegram_filter.py
+# Cheap prefilter for news telegrams. All keywords and patterns are compiled
+# into one byte-level regular expression and run over the raw page bytes, so
+# telegrams that mention none of them are dropped before HTML parsing and
+# never reach the LLM. English keywords (WHOLE_WORDS) only match whole
+# words plus an -s/-d/-ed ending, so "hold" does not hit "shareholders" or
+# "buy" the site's "buyButton". Swedish keywords are stems and match any
+# inflection or compound: "uppgraderar", "riktkursen", "köprekommendation".
+
+import re
+
+# Literal keywords, matched case-insensitively (also for å, ä, ö)
+SWEDISH_KEYWORDS = [
+    "ökning", "höjer", "sänker", "köp", "sälj", "behåll", "riktkurs",
+    "uppgradera", "nedgradera", "rekommendation",
+]
+ENGLISH_KEYWORDS = [
+    "upgrade", "downgrade", "buy", "sell", "hold", "price target", "overweight", "underweight",
+]
+KEYWORDS = SWEDISH_KEYWORDS + ENGLISH_KEYWORDS
+# Keywords that must stand as a whole word
+WHOLE_WORDS = set(ENGLISH_KEYWORDS)
+# Extra regular expressions (bytes, ASCII case-insensitive)
+PATTERNS = [
+    r"riktkurs(?:en)?\s+(?:till\s+)?\d+",
+    r"target price\s+(?:of\s+)?\d+",
+]
+# Around WHOLE_WORDS keywords: no letter or digit before, an optional
+# inflection and no letter or digit after
+WORD_START = rb"(?<![A-Za-z0-9])"
+WORD_END = rb"(?:s|d|ed)?(?![A-Za-z0-9])"
+
+
+def _case_insensitive(word, whole_word=False):
+    # Byte pattern matching `word` in any letter case, including non-ASCII
+    # letters whose UTF-8 bytes re.IGNORECASE would not fold
+    parts = []
+    for char in word:
+        lower, upper = char.lower(), char.upper()
+        if lower != upper and not char.isascii():
+            parts.append(b"(?:" + re.escape(lower.encode("utf-8")) + b"|" + re.escape(upper.encode("utf-8")) + b")")
+        else:
+            parts.append(re.escape(char.encode("utf-8")))
+    pattern = b"".join(parts)
+    if whole_word:
+        pattern = WORD_START + pattern + WORD_END
+    return pattern
+
+
+class TelegramFilter:
+    def __init__(self, keywords=KEYWORDS, patterns=PATTERNS, whole_words=WHOLE_WORDS):
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        whole_words = {w.lower() for w in whole_words}
+        alternatives = [_case_insensitive(k, k.lower() in whole_words) for k in keywords]
+        alternatives += [p.encode("utf-8") for p in patterns]
+        # Longest alternatives first so "riktkurs 50" wins over "riktkurs"
+        alternatives.sort(key=len, reverse=True)
+        self.regex = re.compile(b"|".join(b"(?:" + a + b")" for a in alternatives), re.IGNORECASE)
+
+    @staticmethod
+    def _bytes(raw):
+        return raw.encode("utf-8") if isinstance(raw, str) else raw
+
+    def matches(self, raw, start=0):
+        # True if anything from offset `start` on matches
+        return self.regex.search(self._bytes(raw), start) is not None
+
+    def matched_terms(self, raw):
+        return {m.group(0).decode("utf-8", "ignore").lower() for m in self.regex.finditer(self._bytes(raw))}
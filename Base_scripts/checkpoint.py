@@ -0,0 +1,87 @@
+# checkpoint.py
+# Durable fetch journal so an interrupted fetch_data run can resume where it
+# stopped instead of refetching the whole universe. The journal belongs to
+# one run: its first line names the run (the date by default), and a journal
+# left by another run is discarded instead of resumed, so old quotes never
+# end up in a new snapshot. Only failed_log.json carries over between runs.
+
+import json
+import os
+from datetime import date
+
+JOURNAL_FILE = "avanza_stock_data.journal.jsonl"
+FAILED_LOG = "failed_log.json"
+
+
+# === Append-only JSON Lines journal ===
+class FetchJournal:
+    def __init__(self, path=JOURNAL_FILE, run_id=None):
+        self.path = path
+        self.run_id = run_id or date.today().isoformat()
+        self.file = None
+
+    def load(self):
+        # Return {orderBookId: record} for everything already fetched in
+        # this run. A torn last line (crash mid-write) is ignored; a journal
+        # from another run is removed.
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline())
+            except json.JSONDecodeError:
+                header = None
+            stale = not isinstance(header, dict) or header.get("run") != self.run_id
+            for line in ([] if stale else f):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping damaged journal line in {self.path}")
+                    continue
+                records[str(record.get("orderBookId"))] = record
+        if stale:
+            print(f"🗑 Discarding {self.path} from an earlier run.")
+            self.remove()
+        return records
+
+    def append(self, record):
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+            if self.file.tell() == 0:
+                self.file.write(json.dumps({"run": self.run_id}) + "\n")
+        self.file.write(json.dumps(dict(record), ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# === Failed log ===
+def load_failed_ids(path=FAILED_LOG):
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {str(entry.get("orderBookId")) for entry in json.load(f)}
+
+
+def write_json_atomic(path, data):
+    # Write to a temp file first so a crash never leaves a half-written file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -1,97 +1,175 @@
-from avanza import Avanza
 from datetime import datetime
-import json
+import os
 import time
 
+from checkpoint import FetchJournal, load_failed_ids, write_json_atomic, JOURNAL_FILE, FAILED_LOG
+from fetch_engine import fetch_all, MAX_WORKERS, REQUESTS_PER_SECOND
+from history_store import HistoryStore
+from ranking import apply_hype_potential
+from refresh_planner import load_refresh_state, plan_refresh, save_refresh_state
+from snapshot_store import read_snapshot, read_stock_table, write_snapshot
+from stock_model import StockRecord, StockTable
+
 # Your credentials
 USERNAME = 'asd'
 PASSWORD = 'asd'
 TOTP_SECRET = 'asd'
 
-INPUT_JSON = "avanza_all_companies.json"
-#INPUT_JSON = "avanza_orderbookids_extended.json"
-OUTPUT_JSON = "avanza_stock_data.json"
-
-def fetch_data():
-    # Load list of companies from file
-    with open(INPUT_JSON, "r", encoding="utf-8") as f:
-        companies = json.load(f)
-
-    print(f"📥 Loaded {len(companies)} companies.")
-
-    # Initialize Avanza client
-    avanza = Avanza({
+# Snapshot stems; snapshot_store picks the file format (.parquet / .json)
+INPUT_SNAPSHOT = "avanza_all_companies"
+#INPUT_SNAPSHOT = "avanza_orderbookids_extended"
+OUTPUT_SNAPSHOT = "avanza_stock_data"
+
+# Resume an interrupted run from the same day from JOURNAL_FILE instead of
+# starting over
+RESUME = True
+# Only refetch the companies listed in FAILED_LOG; everything else keeps its
+# record from the last snapshot
+RETRY_FAILED_ONLY = False
+# Also append today's snapshot to the date-partitioned history store
+KEEP_HISTORY = True
+# Only fetch instruments that are due under the refresh policy
+# (refresh_planner.py); the rest keep their record from the last snapshot
+DELTA_REFRESH = True
+
+def parse_stock_info(company, info):
+    # Turn a get_stock_info response into one snapshot record
+    owners = info['keyIndicators'].get('numberOfOwners', None)
+    market_cap_data = info['keyIndicators'].get('marketCapital', {})
+    market_cap = market_cap_data.get('value', None)
+    market_cap_currency = market_cap_data.get('currency', "N/A")
+
+    quote = info.get('quote', {})
+    percent_change = quote.get('changePercent', None)
+    volume = quote.get('totalVolumeTraded', None)
+    value = quote.get('totalValueTraded', None)
+    updated_ts = quote.get('updated', 0)
+
+    historical_data = info.get("historicalClosingPrices", {})
+    first_trading_date = historical_data.get("startDate", None)
+
+    last_updated = datetime.utcfromtimestamp(updated_ts / 1000).replace(microsecond=0).isoformat()
+
+    return StockRecord(
+        name=company.get("name"),
+        orderBookId=company.get("orderBookId"),
+        owners=owners,
+        marketCap=market_cap,
+        marketCapCurrency=market_cap_currency,
+        changePercentToday=percent_change,
+        volumeTradedToday=volume,
+        valueTradedToday=value,
+        firstTradingDate=first_trading_date,
+        lastUpdated=last_updated,
+        # Filled in for the whole snapshot at once by ranking.apply_hype_potential
+        hypePotential=None
+    )
+
+def create_client():
+    # Imported here so parse_stock_info and fetch_data with a fake client
+    # work without the avanza package
+    from avanza import Avanza
+    return Avanza({
         'username': USERNAME,
         'password': PASSWORD,
         'totpSecret': TOTP_SECRET
     })
 
-    stock_data = []
-    failed = []
+def load_previous_snapshot():
+    try:
+        return read_stock_table(OUTPUT_SNAPSHOT)
+    except FileNotFoundError:
+        return None
 
-    for idx, company in enumerate(companies):
-        name = company.get("name")
-        orderBookId = company.get("orderBookId")
+def fetch_data(avanza=None, max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND,
+               resume=RESUME, retry_failed_only=RETRY_FAILED_ONLY, keep_history=KEEP_HISTORY,
+               delta=DELTA_REFRESH):
+    # Load list of companies from file
+    companies = read_snapshot(INPUT_SNAPSHOT, columns=["name", "orderBookId"])
 
-        try:
-            info = avanza.get_stock_info(orderBookId)
-
-            owners = info['keyIndicators'].get('numberOfOwners', None)
-            market_cap_data = info['keyIndicators'].get('marketCapital', {})
-            market_cap = market_cap_data.get('value', None)
-            market_cap_currency = market_cap_data.get('currency', "N/A")
-
-            quote = info.get('quote', {})
-            percent_change = quote.get('changePercent', None)
-            volume = quote.get('totalVolumeTraded', None)
-            value = quote.get('totalValueTraded', None)
-            updated_ts = quote.get('updated', 0)
-
-            historical_data = info.get("historicalClosingPrices", {})
-            first_trading_date = historical_data.get("startDate", None)
-
-            last_updated = datetime.utcfromtimestamp(updated_ts / 1000).replace(microsecond=0).isoformat()
-
-            market_cap_div_owners = (market_cap / owners) if owners and market_cap else None
-            hype_potential = (market_cap_div_owners * value) if market_cap_div_owners and value else None
-
-            stock_data.append({
-                "name": name,
-                "orderBookId": orderBookId,
-                "owners": owners,
-                "marketCap": market_cap,
-                "marketCapCurrency": market_cap_currency,
-                "changePercentToday": percent_change,
-                "volumeTradedToday": volume,
-                "valueTradedToday": value,
-                "firstTradingDate": first_trading_date,
-                "lastUpdated": last_updated,
-                "hypePotential": hype_potential
-            })
-
-            print(f"✅ {idx+1}/{len(companies)} {name} – Done")
-
-            # Optional: Sleep briefly to avoid rate-limiting
-           # time.sleep(0.2)
-
-        except Exception as e:
-            print(f"❌ Failed to fetch for {name} ({orderBookId}): {e}")
-            failed.append({
-                "name": name,
-                "orderBookId": orderBookId,
-                "error": str(e)
-            })
-            time.sleep(1)  # Delay on failure to avoid lockout
+    print(f"📥 Loaded {len(companies)} companies.")
+
+    # Everything fetched so far in this run lives in the journal; a journal
+    # left by an earlier run is discarded by load()
+    journal = FetchJournal(JOURNAL_FILE)
+    if not resume:
+        journal.remove()
+    done = journal.load()
+
+    # Skipped instruments keep their last record
+    carried = {}
+    if retry_failed_only:
+        failed_ids = load_failed_ids(FAILED_LOG)
+        todo = [c for c in companies if str(c.get("orderBookId")) in failed_ids and str(c.get("orderBookId")) not in done]
+        previous = load_previous_snapshot()
+        if previous is not None:
+            carried = {str(record["orderBookId"]): record for record in previous
+                       if str(record["orderBookId"]) not in failed_ids}
+        print(f"🔁 Retrying {len(todo)} companies from {FAILED_LOG}.")
+    else:
+        todo = [c for c in companies if str(c.get("orderBookId")) not in done]
+        if done:
+            print(f"⏩ Resuming: {len(done)} already fetched, {len(todo)} remaining.")
+
+    # Skip instruments that are not due; their last record is carried over
+    if delta and not retry_failed_only:
+        refresh_state = load_refresh_state()
+        todo, carried = plan_refresh(todo, load_previous_snapshot(), refresh_state)
+
+    # Initialize Avanza client (pass a fake client in to run offline)
+    if avanza is None:
+        avanza = create_client()
+
+    # Fetch concurrently; the token bucket and adaptive backoff keep the
+    # request rate below Avanza's lockout threshold. Each result is appended
+    # to the journal as soon as it arrives.
+    try:
+        fetched, failed = fetch_all(
+            avanza, todo, parse_stock_info,
+            max_workers=max_workers,
+            requests_per_second=requests_per_second,
+            on_result=journal.append
+        )
+    finally:
+        journal.close()
+
+    for record in fetched:
+        done[str(record["orderBookId"])] = record
+
+    if delta and not retry_failed_only:
+        # Only quotes requested in this run count as fresh; records resumed
+        # from the journal keep their earlier fetch time
+        now = time.time()
+        refresh_state.update({str(record["orderBookId"]): now for record in fetched})
+        save_refresh_state(refresh_state)
+
+    # Keep the input order in the output file
+    done.update({order_book_id: record for order_book_id, record in carried.items() if order_book_id not in done})
+    stock_data = StockTable(done[str(c.get("orderBookId"))] for c in companies if str(c.get("orderBookId")) in done)
+
+    # Score the whole universe in one vectorized pass
+    apply_hype_potential(stock_data)
 
     # Save results
-    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(stock_data, f, indent=2, ensure_ascii=False)
+    output_path = write_snapshot(stock_data, OUTPUT_SNAPSHOT)
+
+    print(f"\n🎉 Finished! Fetched data for {len(stock_data)} stocks into {output_path}.")
 
-    print(f"\n🎉 Finished! Fetched data for {len(stock_data)} stocks.")
+    if keep_history:
+        history = HistoryStore()
+        try:
+            history_path = history.append(stock_data)
+        finally:
+            history.close()
+        print(f"🗂 Appended today's snapshot to {history_path}.")
+    # The run is complete: the next run starts from scratch and only the
+    # failed ids carry over
+    journal.remove()
     if failed:
-        print(f"⚠ {len(failed)} stocks failed to fetch. Saving to failed_log.json.")
-        with open("failed_log.json", "w", encoding="utf-8") as f:
-            json.dump(failed, f, indent=2, ensure_ascii=False)
+        print(f"⚠ {len(failed)} stocks failed to fetch. Saving to {FAILED_LOG}.")
+        write_json_atomic(FAILED_LOG, failed)
+    elif os.path.exists(FAILED_LOG):
+        os.remove(FAILED_LOG)
 
 if __name__ == "__main__":
     fetch_data()
@@ -0,0 +1,185 @@
+# fetch_engine.py
+# Concurrent, rate-limited fetcher used by fetch_avanza_data.py.
+# Works with any client that exposes get_stock_info(orderBookId), so it can be
+# driven by a local fake client instead of the real Avanza API.
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+# === Defaults ===
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 15.0
+BURST = 15
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5   # seconds, first pause after a failure
+BACKOFF_MAX = 30.0   # seconds, upper bound for the shared pause
+# HTTP statuses worth retrying; any other status fails at once
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = (TimeoutError, ConnectionError)
+if requests is not None:
+    TRANSIENT_ERRORS += (requests.Timeout, requests.ConnectionError)
+
+
+# === Token bucket shared by all workers ===
+class TokenBucket:
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def try_acquire(self, tokens=1):
+        with self.lock:
+            self._refill(self.clock())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        # Block until `tokens` are available
+        while True:
+            with self.lock:
+                now = self.clock()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+# === Adaptive backoff shared by all workers ===
+# Every failure doubles a shared pause (with jitter) that all workers honour
+# before their next request; every success shrinks it again.
+class AdaptiveBackoff:
+    def __init__(self, base=BACKOFF_BASE, maximum=BACKOFF_MAX, clock=time.monotonic, sleep=time.sleep):
+        self.base = base
+        self.maximum = maximum
+        self.clock = clock
+        self.sleep = sleep
+        self.failures = 0
+        self.pause_until = 0.0
+        self.lock = threading.Lock()
+
+    def current_delay(self):
+        if self.failures == 0:
+            return 0.0
+        return min(self.maximum, self.base * (2 ** (self.failures - 1)))
+
+    def wait(self):
+        with self.lock:
+            remaining = self.pause_until - self.clock()
+        if remaining > 0:
+            self.sleep(remaining)
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            delay = self.current_delay() * random.uniform(0.8, 1.2)
+            self.pause_until = max(self.pause_until, self.clock() + delay)
+            return delay
+
+    def success(self):
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+
+
+def is_transient(error):
+    # Rate limits, server errors, timeouts and dropped connections are
+    # retried with backoff; anything else (404, bad credentials, ...) is not
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUSES
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+# === Concurrent fetch ===
+def fetch_all(client, companies, parse, max_workers=MAX_WORKERS,
+              requests_per_second=REQUESTS_PER_SECOND, burst=BURST,
+              max_retries=MAX_RETRIES, bucket=None, backoff=None,
+              on_result=None, on_failure=None):
+    # Fetch get_stock_info for every company and turn it into a record with
+    # parse(company, info). Returns (records, failed) in input order. Only
+    # transient request errors are retried and slow down the other workers;
+    # permanent errors and parse errors fail the company at once.
+    bucket = bucket or TokenBucket(requests_per_second, burst)
+    backoff = backoff or AdaptiveBackoff()
+    total = len(companies)
+    results = [None] * total
+    failures = [None] * total
+    progress = {"done": 0}
+    progress_lock = threading.Lock()
+
+    def worker(idx, company):
+        name = company.get("name")
+        orderBookId = company.get("orderBookId")
+        error = None
+        record = None
+
+        for attempt in range(max_retries + 1):
+            backoff.wait()
+            bucket.acquire()
+            try:
+                info = client.get_stock_info(orderBookId)
+            except Exception as e:
+                error = e
+                if not is_transient(e):
+                    print(f"❌ Failed to fetch for {name} ({orderBookId}): {e}")
+                    break
+                delay = backoff.failure()
+                print(f"❌ Failed to fetch for {name} ({orderBookId}), attempt {attempt+1}: {e} – backing off {delay:.1f}s")
+                continue
+
+            backoff.success()
+            try:
+                record = parse(company, info)
+            except Exception as e:
+                error = e
+                print(f"❌ Failed to parse {name} ({orderBookId}): {e}")
+            break
+
+        if record is not None:
+            results[idx] = record
+            with progress_lock:
+                progress["done"] += 1
+                done = progress["done"]
+                if on_result:
+                    on_result(record)
+            print(f"✅ {done}/{total} {name} – Done")
+            return
+
+        failures[idx] = {
+            "name": name,
+            "orderBookId": orderBookId,
+            "error": str(error)
+        }
+        if on_failure:
+            with progress_lock:
+                on_failure(failures[idx])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for future in [executor.submit(worker, idx, company) for idx, company in enumerate(companies)]:
+            future.result()
+
+    records = [r for r in results if r is not None]
+    failed = [f for f in failures if f is not None]
+    return records, failed
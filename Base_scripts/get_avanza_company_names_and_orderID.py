@@ -1,68 +1,191 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import ElementClickInterceptedException, NoSuchElementException
+import requests
 import time
-import json
 
-options = Options()
-options.add_argument("--start-maximized")
-# options.add_argument("--headless")  # Uncomment to run headless (faster, no UI)
+from snapshot_store import read_snapshot, write_snapshot
 
-driver = webdriver.Chrome(options=options)
-driver.get("https://www.avanza.se/aktier/lista.html")
-time.sleep(3)  # Just enough for initial load
+OUTPUT_SNAPSHOT = "avanza_all_companies"
 
-# Step 1: Click "Visa fler" until all companies are loaded
-max_scrolls = 700
-previous_count = 0
-wait_time = 1.2
+# "api" pages through the JSON behind the stock list; "selenium" clicks
+# "Visa fler" in a browser. "api" falls back to "selenium" if it fails.
+DISCOVERY_MODE = "api"
 
-for scroll in range(max_scrolls):
-    current_count = len(driver.find_elements(By.CSS_SELECTOR, "a[title][href*='/aktier/om-aktien.html']"))
+# === API discovery ===
+STOCK_LIST_API = "https://www.avanza.se/_api/market-stock-filter/"
+PAGE_SIZE = 100
+REQUEST_TIMEOUT = 15
 
+# === Selenium discovery ===
+STOCK_LIST_URL = "https://www.avanza.se/aktier/lista.html"
+ROW_SELECTOR = "a[title][href*='/aktier/om-aktien.html']"
+MAX_SCROLLS = 700
+WAIT_TIME = 10  # seconds to wait for the first rows and for new rows after a click
 
-    # Stop if no new entries loaded
-    if current_count == previous_count:
-        print(f"⚠️ No new companies after {scroll} scrolls. Stopping.")
-        break
+# Returns [title, href] for rows from index `arguments[1]` on, so each click
+# only transfers the rows it added instead of the whole list
+NEW_ROWS_JS = """
+const rows = document.querySelectorAll(arguments[0]);
+const out = [];
+for (let i = arguments[1]; i < rows.length; i++) {
+    out.push([rows[i].getAttribute('title'), rows[i].href]);
+}
+return out;
+"""
 
-    previous_count = current_count
 
-    # Try to click "Visa fler" button
+def parse_row(title, href):
+    if not title or not href or "aktien.html/" not in href:
+        return None
+    return {
+        "name": title.strip(),
+        "orderBookId": href.split("aktien.html/")[1].split("/")[0]
+    }
+
+
+def discover_api(session=None, page_size=PAGE_SIZE):
+    # Page through the list data directly, page_size rows per request
+    session = session or requests.Session()
+    companies = []
+    offset = 0
+    while True:
+        payload = {
+            "filter": {"marketPlaces": [], "countryCodes": [], "sectors": [], "stockLists": []},
+            "offset": offset,
+            "limit": page_size,
+            "sortBy": {"field": "name", "order": "asc"}
+        }
+        response = session.post(STOCK_LIST_API, json=payload, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        stocks = data.get("stocks", [])
+
+        for stock in stocks:
+            orderbook_id = stock.get("orderbookId") or stock.get("orderBookId")
+            if orderbook_id is not None:
+                companies.append({"name": stock.get("name"), "orderBookId": str(orderbook_id)})
+
+        offset += len(stocks)
+        total = data.get("totalNumberOfOrderbooks")
+        print(f"🔄 Companies loaded: {offset}" + (f"/{total}" if total else ""))
+        if not stocks or len(stocks) < page_size or (total and offset >= total):
+            break
+    return companies
+
+
+def discover_selenium(headless=False):
+    # Imported here so API discovery (and the benchmarks) work without selenium
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import ElementClickInterceptedException, NoSuchElementException, TimeoutException
+
+    options = Options()
+    options.add_argument("--start-maximized")
+    if headless:
+        options.add_argument("--headless")
+
+    driver = webdriver.Chrome(options=options)
+    companies = []
     try:
-        show_more_button = driver.find_element(By.CSS_SELECTOR, "button[data-e2e='tbs-stocks-show-more']")
-        driver.execute_script("arguments[0].scrollIntoView({behavior: 'instant', block: 'center'});", show_more_button)
-        time.sleep(0.3)
-        show_more_button.click()
-        time.sleep(wait_time)  # Reduce wait but still allow DOM update
-    except (NoSuchElementException, ElementClickInterceptedException):
-        print(f"🚫 No more 'Visa fler' button found at scroll {scroll}.")
-        break
-
-    print(f"🔄 Scroll {scroll+1}, Companies loaded: {current_count}")
-
-# Step 2: Extract data from all loaded entries
-print("📦 Extracting company names and orderBookIds...")
-companies = []
-
-for el in driver.find_elements(By.CSS_SELECTOR, "a[title][href*='/aktier/om-aktien.html']"):
+        driver.get(STOCK_LIST_URL)
+        wait = WebDriverWait(driver, WAIT_TIME, poll_frequency=0.1)
+        row_count = lambda d: d.execute_script("return document.querySelectorAll(arguments[0]).length;", ROW_SELECTOR)
+        seen = 0
+
+        # The list renders after the page loads; wait for the first rows
+        try:
+            wait.until(lambda d: row_count(d) > 0)
+        except TimeoutException:
+            print(f"⚠️ No companies rendered within {WAIT_TIME}s.")
+            return companies
+
+        for scroll in range(MAX_SCROLLS):
+            # Only extract rows added since the last click
+            for title, href in driver.execute_script(NEW_ROWS_JS, ROW_SELECTOR, seen):
+                company = parse_row(title, href)
+                if company:
+                    companies.append(company)
+                seen += 1
+
+            try:
+                show_more_button = driver.find_element(By.CSS_SELECTOR, "button[data-e2e='tbs-stocks-show-more']")
+                driver.execute_script("arguments[0].scrollIntoView({behavior: 'instant', block: 'center'});", show_more_button)
+                show_more_button.click()
+            except (NoSuchElementException, ElementClickInterceptedException):
+                print(f"🚫 No more 'Visa fler' button found at scroll {scroll}.")
+                break
+
+            # Wait until the click added rows instead of sleeping a fixed time
+            try:
+                wait.until(lambda d: row_count(d) > seen)
+            except TimeoutException:
+                print(f"⚠️ No new companies after {scroll} scrolls. Stopping.")
+                break
+
+            print(f"🔄 Scroll {scroll+1}, Companies loaded: {seen}")
+    finally:
+        driver.quit()
+    return companies
+
+
+def diff_companies(previous, current):
+    # (added, removed) between two company lists, by orderBookId
+    previous_ids = {str(c.get("orderBookId")) for c in previous}
+    current_ids = {str(c.get("orderBookId")) for c in current}
+    added = [c for c in current if str(c.get("orderBookId")) not in previous_ids]
+    removed = [c for c in previous if str(c.get("orderBookId")) not in current_ids]
+    return added, removed
+
+
+def load_previous():
     try:
-        name = el.get_attribute("title").strip()
-        relative_url = el.get_attribute("href").strip()
-        if "aktien.html/" in relative_url:
-            orderbook_id = relative_url.split("aktien.html/")[1].split("/")[0]
-            companies.append({
-                "name": name,
-                "orderBookId": orderbook_id
-            })
-    except Exception:
-        continue
-
-driver.quit()
-
-# Step 3: Save results
-with open("avanza_all_companies.json", "w", encoding="utf-8") as f:
-    json.dump(companies, f, indent=2, ensure_ascii=False)
-
-print(f"✅ Done! Extracted {len(companies)} companies.")
+        return read_snapshot(OUTPUT_SNAPSHOT, columns=["name", "orderBookId"])
+    except FileNotFoundError:
+        return []
+
+
+def discover(mode=DISCOVERY_MODE):
+    if mode == "api":
+        try:
+            companies = discover_api()
+            if companies:
+                return companies
+            print("⚠️ API discovery returned no companies, falling back to Selenium.")
+        except (requests.RequestException, ValueError) as e:
+            print(f"⚠️ API discovery failed ({e}), falling back to Selenium.")
+    try:
+        return discover_selenium()
+    except ImportError as e:
+        print(f"⚠️ Selenium fallback unavailable ({e}).")
+        return []
+
+
+def main():
+    start = time.time()
+    print("📦 Extracting company names and orderBookIds...")
+    companies = discover()
+    if not companies:
+        print("⚠️ No companies found, keeping the previous list.")
+        return
+
+    # Drop duplicates, keep the list order
+    unique = {}
+    for company in companies:
+        unique.setdefault(company["orderBookId"], company)
+    companies = list(unique.values())
+
+    previous = load_previous()
+    added, removed = diff_companies(previous, companies)
+    print(f"🆕 {len(added)} new, ❌ {len(removed)} removed since the last discovery.")
+    for company in added:
+        print(f"   + {company['name']} ({company['orderBookId']})")
+    for company in removed:
+        print(f"   - {company['name']} ({company['orderBookId']})")
+
+    # Save results
+    output_path = write_snapshot(companies, OUTPUT_SNAPSHOT)
+
+    print(f"✅ Done! Extracted {len(companies)} companies into {output_path} in {time.time() - start:.1f}s.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# history_store.py
+# Append-only history of daily snapshots so owners, valueTradedToday,
+# changePercentToday and hypePotential can be tracked over time.
+#
+# Layout:
+#   history/date=2025-07-25/part-000.jsonl   one record per line, never rewritten
+#   history/index.sqlite                     (orderBookId, date) -> file offset
+#
+# The index is clustered on (orderBookId, date), so a range query for a set
+# of ids only touches the index pages and the byte ranges of those rows.
+
+import json
+import os
+import sqlite3
+from datetime import date as date_cls
+
+from stock_model import StockTable
+
+HISTORY_DIR = "history"
+INDEX_FILE = "index.sqlite"
+SQLITE_MAX_VARS = 500
+
+
+class HistoryStore:
+    def __init__(self, root=HISTORY_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, INDEX_FILE))
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS rows (
+                orderBookId TEXT NOT NULL,
+                date TEXT NOT NULL,
+                part TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                PRIMARY KEY (orderBookId, date, part)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS rows_by_date ON rows (date);
+            CREATE TABLE IF NOT EXISTS parts (
+                part TEXT PRIMARY KEY,
+                date TEXT NOT NULL,
+                rows INTEGER NOT NULL
+            );
+        """)
+
+    def close(self):
+        self.db.close()
+
+    # === Writing ===
+    def _partition_dir(self, day):
+        return os.path.join(self.root, f"date={day}")
+
+    def _part_path(self, part):
+        # Parts are stored in the index with "/" so the index is portable
+        return os.path.join(self.root, *part.split("/"))
+
+    def append(self, records, day=None):
+        # Write records as a new part in the day's partition and index them
+        day = day or date_cls.today().isoformat()
+        partition = self._partition_dir(day)
+        os.makedirs(partition, exist_ok=True)
+
+        existing = [name for name in os.listdir(partition) if name.startswith("part-") and name.endswith(".jsonl")]
+        part = f"date={day}/part-{len(existing):03d}.jsonl"
+        path = self._part_path(part)
+
+        index_rows = []
+        offset = 0
+        if isinstance(records, StockTable):
+            records = records.to_dicts()
+        with open(path + ".tmp", "wb") as f:
+            for record in records:
+                line = (json.dumps(dict(record), ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                index_rows.append((str(record.get("orderBookId")), day, part, offset, len(line)))
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+        self._index_part(part, day, index_rows)
+        return path
+
+    def _index_part(self, part, day, index_rows):
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?, ?)", index_rows)
+            self.db.execute("INSERT OR REPLACE INTO parts VALUES (?, ?, ?)", (part, day, len(index_rows)))
+
+    def rebuild_index(self):
+        # Index any part files that were written but not indexed (e.g. after a crash)
+        indexed = {row[0] for row in self.db.execute("SELECT part FROM parts")}
+        added = 0
+        for partition in sorted(os.listdir(self.root)):
+            if not partition.startswith("date="):
+                continue
+            day = partition[len("date="):]
+            for name in sorted(os.listdir(os.path.join(self.root, partition))):
+                part = f"{partition}/{name}"
+                if not name.endswith(".jsonl") or part in indexed:
+                    continue
+                index_rows = []
+                offset = 0
+                with open(self._part_path(part), "rb") as f:
+                    for line in f:
+                        record = json.loads(line)
+                        index_rows.append((str(record.get("orderBookId")), day, part, offset, len(line)))
+                        offset += len(line)
+                self._index_part(part, day, index_rows)
+                added += 1
+        return added
+
+    # === Reading ===
+    def dates(self):
+        return [row[0] for row in self.db.execute("SELECT DISTINCT date FROM parts ORDER BY date")]
+
+    def _locate(self, ids, start, end):
+        # If a day was appended more than once (re-run), the latest part wins
+        locations = []
+        ids = [str(i) for i in ids]
+        for i in range(0, len(ids), SQLITE_MAX_VARS):
+            chunk = ids[i:i + SQLITE_MAX_VARS]
+            placeholders = ",".join("?" * len(chunk))
+            locations.extend(self.db.execute(
+                f"SELECT MAX(part), offset, length, date FROM rows "
+                f"WHERE orderBookId IN ({placeholders}) AND date BETWEEN ? AND ? "
+                f"GROUP BY orderBookId, date",
+                chunk + [start, end]
+            ))
+        return locations
+
+    def query(self, ids, start, end, columns=None):
+        # StockTable of the records for `ids` with start <= date <= end (ISO
+        # dates, inclusive). Each row gets a "date" column for its partition.
+        locations = sorted(self._locate(ids, start, end))
+        results = StockTable()
+        current_part, f = None, None
+        try:
+            for part, offset, length, day in locations:
+                if part != current_part:
+                    if f:
+                        f.close()
+                    f = open(self._part_path(part), "rb")
+                    current_part = part
+                f.seek(offset)
+                record = json.loads(f.read(length))
+                record["date"] = day
+                if columns:
+                    record = {c: record.get(c) for c in ["orderBookId", "date"] + list(columns)}
+                results.append(record)
+        finally:
+            if f:
+                f.close()
+        return results
+
+    def series(self, ids, column, start, end):
+        # {orderBookId: [(date, value), ...]} sorted by date
+        out = {str(i): [] for i in ids}
+        for record in self.query(ids, start, end, columns=[column]):
+            out[str(record["orderBookId"])].append((record["date"], record[column]))
+        for values in out.values():
+            values.sort(key=lambda v: v[0])
+        return out
@@ -0,0 +1,199 @@
+# intraday_daemon.py
+# Long-running intraday poller. While the market is open it polls every
+# POLL_INTERVAL seconds: refresh_planner picks the due instruments (by tier,
+# least recently fetched first), each one is fetched with get_stock_info as
+# in fetch_data, and the fresh quote updates the in-memory universe (a
+# StockTable) and the hypePotential ranking for that instrument only. At
+# most REQUESTS_PER_MINUTE requests are sent in any 60 seconds; instruments
+# whose fetch keeps failing are backed off (refresh_planner.record_failure)
+# so they cannot use up that budget. At market close (and on exit) the
+# universe is written as the avanza_stock_data snapshot. The clock and the
+# client are injectable, so a SimulatedClock and a fake client run a whole
+# trading day in milliseconds.
+# To run: `python intraday_daemon.py`
+
+import time
+from collections import deque
+from datetime import datetime, time as time_of_day, timedelta
+from zoneinfo import ZoneInfo
+
+from fetch_avanza_data import INPUT_SNAPSHOT, OUTPUT_SNAPSHOT, create_client, load_previous_snapshot, parse_stock_info
+from history_store import HistoryStore
+from ranking import IncrementalRanking
+from refresh_planner import load_refresh_state, plan_refresh, record_failure, save_refresh_state
+from snapshot_store import read_snapshot, write_snapshot
+from stock_model import FIELDS, StockTable
+
+# === Configuration ===
+MARKET_TZ = ZoneInfo("Europe/Stockholm")
+MARKET_OPEN = time_of_day(9, 0)
+MARKET_CLOSE = time_of_day(17, 30)
+TRADING_DAYS = {0, 1, 2, 3, 4}  # Monday-Friday
+POLL_INTERVAL = 60               # seconds between polls
+REQUESTS_PER_MINUTE = 100
+TOP_K = 10                       # leaders printed after each poll
+KEEP_HISTORY = True
+
+
+# === Clocks ===
+class SystemClock:
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class SimulatedClock:
+    # Starts at `start` (an aware datetime) and only moves when sleep() is called
+    def __init__(self, start):
+        self.now = start.timestamp()
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(seconds, 0)
+
+
+# === Market hours ===
+def market_open(moment):
+    local = moment.astimezone(MARKET_TZ)
+    return local.weekday() in TRADING_DAYS and MARKET_OPEN <= local.time() < MARKET_CLOSE
+
+
+def next_open(moment):
+    # The next market open strictly after `moment`
+    local = moment.astimezone(MARKET_TZ)
+    day = local.date()
+    while True:
+        candidate = datetime.combine(day, MARKET_OPEN, tzinfo=MARKET_TZ)
+        if candidate > local and candidate.weekday() in TRADING_DAYS:
+            return candidate
+        day += timedelta(days=1)
+
+
+# === Request budget ===
+class MinuteBudget:
+    # At most `limit` requests in any `window` seconds
+    def __init__(self, limit=REQUESTS_PER_MINUTE, clock=None, window=60):
+        self.limit = limit
+        self.clock = clock or SystemClock()
+        self.window = window
+        self.sent = deque()
+
+    def try_spend(self):
+        now = self.clock.time()
+        while self.sent and now - self.sent[0] >= self.window:
+            self.sent.popleft()
+        if len(self.sent) >= self.limit:
+            return False
+        self.sent.append(now)
+        return True
+
+
+# === Daemon ===
+class IntradayDaemon:
+    def __init__(self, client=None, clock=None, companies=None, universe=None,
+                 poll_interval=POLL_INTERVAL, requests_per_minute=REQUESTS_PER_MINUTE, save=True):
+        self.clock = clock or SystemClock()
+        self.client = client or create_client()
+        self.companies = companies if companies is not None else read_snapshot(INPUT_SNAPSHOT, columns=["name", "orderBookId"])
+        if universe is None:
+            universe = load_previous_snapshot() if save else None
+        self.universe = universe if universe is not None else StockTable()
+        self.rows = self.universe.positions("orderBookId")
+        self.ranking = IncrementalRanking()
+        self.ranking.load(self.universe)
+        self.poll_interval = poll_interval
+        self.budget = MinuteBudget(requests_per_minute, self.clock)
+        self.save = save
+        self.state = load_refresh_state() if save else {}
+        self.failures = {}
+        self.stats = {"polls": 0, "requests": 0, "failed": 0}
+        self.leaders = []
+
+    def now(self):
+        return datetime.fromtimestamp(self.clock.time(), MARKET_TZ)
+
+    def apply(self, record):
+        # Store one fresh quote and re-rank only that instrument
+        key = str(record["orderBookId"])
+        if key in self.rows:
+            row = self.rows[key]
+            for field in FIELDS:
+                self.universe.set(row, field, record.get(field))
+        else:
+            row = self.rows[key] = len(self.universe)
+            self.universe.append(record)
+        self.universe.set(row, "hypePotential", self.ranking.update(record))
+        self.state[key] = self.clock.time()
+        self.failures.pop(key, None)
+
+    def poll(self):
+        # One poll: fetch due instruments in plan order until the request
+        # budget for this minute is spent
+        todo, _ = plan_refresh(self.companies, self.universe, self.state, now=self.clock.time(), verbose=False,
+                               failures=self.failures)
+        for company in todo:
+            if not self.budget.try_spend():
+                break
+            try:
+                record = parse_stock_info(company, self.client.get_stock_info(company["orderBookId"]))
+            except Exception as e:
+                self.stats["failed"] += 1
+                record_failure(self.failures, company["orderBookId"], self.clock.time())
+                print(f"❌ Error fetching {company.get('name')}: {e}")
+                continue
+            self.stats["requests"] += 1
+            self.apply(record)
+        self.stats["polls"] += 1
+
+        leaders = [key for key, _ in self.ranking.top(TOP_K)]
+        if leaders != self.leaders:
+            self.leaders = leaders
+            names = dict(zip(self.universe.column("orderBookId"), self.universe.column("name")))
+            print(f"🏁 {self.now():%H:%M} top hypePotential: " + ", ".join(names.get(k) or k for k in leaders))
+
+    def persist(self):
+        if not self.save:
+            return
+        path = write_snapshot(self.universe, OUTPUT_SNAPSHOT)
+        save_refresh_state(self.state)
+        if KEEP_HISTORY:
+            history = HistoryStore()
+            try:
+                history.append(self.universe)
+            finally:
+                history.close()
+        print(f"💾 Saved {len(self.universe)} instruments to {path}.")
+
+    def run(self, until=None):
+        # Poll during market hours and sleep through closed hours; stops at
+        # `until` (an aware datetime) if given, otherwise runs forever
+        in_session = False
+        try:
+            while until is None or self.now() < until:
+                moment = self.now()
+                if not market_open(moment):
+                    if in_session:
+                        print(f"🔔 Market closed: {self.stats['requests']} requests, {self.stats['failed']} failed.")
+                        self.persist()
+                        in_session = False
+                    wake = next_open(moment) if until is None else min(next_open(moment), until)
+                    self.clock.sleep((wake - moment).total_seconds())
+                    continue
+
+                in_session = True
+                started = self.clock.time()
+                self.poll()
+                self.clock.sleep(self.poll_interval - (self.clock.time() - started))
+        finally:
+            if in_session:
+                self.persist()
+        return self.stats
+
+
+if __name__ == "__main__":
+    IntradayDaemon().run()
@@ -1,35 +1,38 @@
-import json
 import matplotlib.pyplot as plt
 
-INPUT_FILE = "healthcare_companies.json"
+from ranking import compile_formulas, evaluate
+from scoring import top_k
+from snapshot_store import read_stock_table
+
+INPUT_SNAPSHOT = "healthcare_companies"
+# Name of the ranking formula (ranking.FORMULAS / ranking_formulas.json)
+SCORE_FORMULA = "activity"
 
 def main():
-    # Load the stock data
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # Filter entries with required fields and AI tag
-    filtered = [
-        d for d in data
-        if (
-            d.get("valueTradedToday") is not None and
-            d.get("changePercentToday") is not None and
-            d.get("marketCapCurrency") == ("USD" or "SEK") and
-            d.get("healthcare_company") is True
-        )
-    ]
-
-    # Compute a composite score
-    for d in filtered:
-        d["score"] = d["valueTradedToday"] * abs(d["changePercentToday"])
+    formula = compile_formulas()[SCORE_FORMULA]
+
+    # Load only the needed columns; the sector and currency filters are
+    # applied while reading the snapshot
+    filtered = read_stock_table(
+        INPUT_SNAPSHOT,
+        columns=list(dict.fromkeys(["name", "changePercentToday"] + formula.columns)),
+        filters=[
+            ("marketCapCurrency", "in", {"USD", "SEK"}),
+            ("healthcare_company", "==", True),
+        ]
+    )
+
+    # Compute the composite score for all entries at once; entries missing
+    # a field get NaN and never make the top 20
+    scores = evaluate(filtered, {SCORE_FORMULA: formula})[SCORE_FORMULA]
 
     # Get top 20 by composite score
-    top_20 = sorted(filtered, key=lambda x: x["score"], reverse=True)[:20]
+    top_20 = top_k(scores, 20)
 
     # Extract data
-    names = [item["name"] for item in top_20]
-    values = [item["score"] for item in top_20]
-    change_directions = [item["changePercentToday"] for item in top_20]
+    names = [filtered.value("name", i) for i in top_20]
+    values = [float(scores[i]) for i in top_20]
+    change_directions = [filtered.value("changePercentToday", i) for i in top_20]
 
     # Determine colors based on positive/negative change
     colors = ['green' if cp >= 0 else 'red' for cp in change_directions]
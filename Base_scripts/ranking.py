@@ -0,0 +1,204 @@
+# ranking.py
+# Named ranking formulas such as "marketCap / owners * valueTradedToday".
+# Each formula is parsed once and compiled into a function over snapshot
+# columns (NumPy arrays), so any number of rankings can be evaluated in one
+# pass over the data. Add formulas to FORMULAS or to RANKINGS_FILE.
+
+import ast
+import bisect
+import functools
+import json
+import math
+import os
+
+import numpy as np
+
+from scoring import to_columns, to_optional, top_k
+from stock_model import StockTable
+
+# === Configuration ===
+FORMULAS = {
+    "hypePotential": "marketCap / owners * valueTradedToday",
+    "activity": "valueTradedToday * abs(changePercentToday)",
+}
+# Optional {name: formula} JSON file that adds to / overrides FORMULAS
+RANKINGS_FILE = "ranking_formulas.json"
+
+# name: (NumPy function, argument count); None means two or more, folded
+# pairwise, so min(a, b, c) works and no argument reaches NumPy's out=
+FUNCTIONS = {
+    "abs": (np.abs, 1),
+    "sqrt": (np.sqrt, 1),
+    "log": (np.log, 1),
+    "log1p": (np.log1p, 1),
+    "min": (np.minimum, None),
+    "max": (np.maximum, None),
+}
+
+BINARY_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+}
+
+UNARY_OPS = {
+    ast.USub: np.negative,
+    ast.UAdd: np.positive,
+}
+
+
+# === Compiler ===
+class Formula:
+    def __init__(self, name, source):
+        self.name = name
+        self.source = source
+        self.columns = []
+        try:
+            tree = ast.parse(source, mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid formula {name!r}: {source!r} ({e.msg})") from None
+        self._evaluate = self._compile(tree.body)
+
+    def _compile(self, node):
+        # Turn the syntax tree into nested closures once; evaluation then only
+        # runs NumPy operations on whole columns
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            value = float(node.value)
+            return lambda cols: value
+
+        if isinstance(node, ast.Name):
+            column = node.id
+            if column not in self.columns:
+                self.columns.append(column)
+            return lambda cols: cols[column]
+
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+            op = BINARY_OPS[type(node.op)]
+            left = self._compile(node.left)
+            right = self._compile(node.right)
+            return lambda cols: op(left(cols), right(cols))
+
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPS:
+            op = UNARY_OPS[type(node.op)]
+            operand = self._compile(node.operand)
+            return lambda cols: op(operand(cols))
+
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in FUNCTIONS and not node.keywords):
+            func, arity = FUNCTIONS[node.func.id]
+            count = len(node.args)
+            if count != arity if arity is not None else count < 2:
+                expected = arity if arity is not None else "at least 2"
+                raise ValueError(f"{node.func.id}() in formula {self.name!r} takes {expected} arguments, got {count}")
+            args = [self._compile(arg) for arg in node.args]
+            if arity is None:
+                return lambda cols: functools.reduce(func, [arg(cols) for arg in args])
+            return lambda cols: func(*[arg(cols) for arg in args])
+
+        raise ValueError(f"Unsupported expression in formula {self.name!r}: {ast.unparse(node)}")
+
+    def __call__(self, cols, length):
+        # One score per row (`length` rows, so formulas of constants are
+        # broadcast too). Missing inputs, division by zero and log of <= 0
+        # all give NaN (no score)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            result = np.broadcast_to(np.asarray(self._evaluate(cols), dtype=np.float64), (length,)).copy()
+        result[~np.isfinite(result)] = np.nan
+        return result
+
+
+def load_formulas(path=RANKINGS_FILE):
+    formulas = dict(FORMULAS)
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            formulas.update(json.load(f))
+    return formulas
+
+
+def compile_formulas(formulas=None):
+    formulas = load_formulas() if formulas is None else formulas
+    return {name: Formula(name, source) for name, source in formulas.items()}
+
+
+# === Evaluation ===
+def evaluate(records, formulas):
+    # {name: score array} for every compiled formula. Each column is
+    # converted once, however many formulas use it.
+    columns = []
+    for formula in formulas.values():
+        for column in formula.columns:
+            if column not in columns:
+                columns.append(column)
+    cols = to_columns(records, columns)
+    return {name: formula(cols, len(records)) for name, formula in formulas.items()}
+
+
+def rank(records, formulas, k):
+    # {name: [(record, score), ...]} with the top k records per formula
+    scores = evaluate(records, formulas)
+    return {
+        name: [(records[i], float(values[i])) for i in top_k(values, k)]
+        for name, values in scores.items()
+    }
+
+
+def apply_hype_potential(records, formula=None):
+    # Fill in hypePotential on a StockTable or a list of snapshot records
+    # in one pass
+    formula = formula or compile_formulas()["hypePotential"]
+    scores = formula(to_columns(records, formula.columns), len(records))
+    if isinstance(records, StockTable):
+        records.set_column("hypePotential", scores)
+        return records
+    scores = to_optional(scores)
+    for record, score in zip(records, scores):
+        record["hypePotential"] = score
+    return records
+
+
+# === Incremental ranking ===
+class IncrementalRanking:
+    # Ranks the universe by one formula and keeps it ranked as single
+    # quotes arrive: an update rescores one record and moves one entry in a
+    # sorted list (two binary searches) instead of re-ranking everything.
+    # Records whose score is NaN are not ranked.
+    def __init__(self, formula=None):
+        self.formula = formula or compile_formulas()["hypePotential"]
+        self.scores = {}
+        self.order = []  # (-score, orderBookId), best first
+
+    def load(self, records):
+        # Rank a whole StockTable or list of records in one vectorized pass
+        scores = self.formula(to_columns(records, self.formula.columns), len(records))
+        ids = records.column("orderBookId") if isinstance(records, StockTable) else [r.get("orderBookId") for r in records]
+        self.scores = {str(i): float(s) for i, s in zip(ids, scores)}
+        self.order = sorted((-s, i) for i, s in self.scores.items() if not math.isnan(s))
+        return scores
+
+    def score(self, record):
+        return float(self.formula(to_columns([record], self.formula.columns), 1)[0])
+
+    def update(self, record):
+        # Rescore one record; returns its new score
+        key = str(record.get("orderBookId"))
+        new = self.score(record)
+        old = self.scores.get(key)
+        if old is not None and not math.isnan(old):
+            del self.order[bisect.bisect_left(self.order, (-old, key))]
+        if not math.isnan(new):
+            bisect.insort(self.order, (-new, key))
+        self.scores[key] = new
+        return new
+
+    def top(self, k):
+        # [(orderBookId, score)] for the k best
+        return [(key, -negative) for negative, key in self.order[:k]]
+
+    def rank(self, order_book_id):
+        # 0-based position, or None if unranked
+        score = self.scores.get(str(order_book_id))
+        if score is None or math.isnan(score):
+            return None
+        return bisect.bisect_left(self.order, (-score, str(order_book_id)))
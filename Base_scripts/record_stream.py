@@ -0,0 +1,94 @@
+# record_stream.py
+# Incremental readers for JSON record files: one JSON array of objects (the
+# snapshot format) or JSON Lines (the history partitions). Records are
+# decoded one at a time from a fixed-size read buffer, so memory stays
+# bounded by the largest record instead of the file size.
+
+import json
+
+CHUNK_SIZE = 1 << 16  # characters per read
+WHITESPACE = " \t\r\n"
+# What may follow an array element
+DELIMITERS = WHITESPACE + ",]"
+
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    # Yield the elements of a top-level JSON array from a text file object.
+    # Elements must be separated by "," and the array closed by "]";
+    # anything else raises ValueError.
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    state = "start"  # start -> first -> (separator -> value)* -> done
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in WHITESPACE:
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Expected a JSON array" if state == "start" else "Unterminated JSON array")
+        else:
+            char = buffer[pos]
+            if state == "start":
+                if char != "[":
+                    raise ValueError("Expected a JSON array")
+                state = "first"
+                pos += 1
+                continue
+            if state in ("first", "separator") and char == "]":
+                return
+            if state == "separator":
+                if char != ",":
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+                state = "value"
+                pos += 1
+                continue
+
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                value, end = None, None
+            if end is not None:
+                # Objects, arrays and strings end with their own closing
+                # character; a number or literal is only complete once a
+                # delimiter follows ("1.5" may continue as "1.5e10")
+                if isinstance(value, (dict, list, str)) or eof or (end < len(buffer) and buffer[end] in DELIMITERS):
+                    yield value
+                    state = "separator"
+                    pos = end
+                    continue
+                if any(c in DELIMITERS for c in buffer[end:]):
+                    raise ValueError(f"Invalid value in JSON array: {buffer[pos:end + 1]!r}")
+
+        # Need more input: drop what has been consumed and read on
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def iter_json_lines(f):
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_json_file(path, chunk_size=CHUNK_SIZE):
+    # Records from a .json array or a JSON Lines file; the format is taken
+    # from the first non-whitespace character
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            char = f.read(1)
+            if not char or char not in WHITESPACE:
+                break
+        if not char:
+            return
+        f.seek(0)
+        if char == "[":
+            yield from iter_json_array(f, chunk_size)
+        else:
+            yield from iter_json_lines(f)
@@ -0,0 +1,130 @@
+# refresh_planner.py
+# Decides which instruments a fetch_data run actually requests. Each
+# company is put in an activity tier from the previous snapshot (volume,
+# value traded and how long ago its quote last moved); each tier has a
+# refresh interval, and refresh_state.json remembers when every instrument
+# was last fetched. Only instruments whose interval has passed are fetched,
+# by tier and then least recently fetched first, so a capped run (or the
+# intraday daemon) cycles through a tier instead of refetching the same
+# names; the rest carry their previous record forward. Busy
+# names are refreshed every run, halted or delisted ones about once a week.
+# Instruments whose fetch keeps failing are held back with an exponential
+# backoff, so they cannot take the whole request budget of every run.
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from checkpoint import write_json_atomic
+
+REFRESH_STATE_FILE = "refresh_state.json"
+
+# Refresh interval per tier, in seconds
+INTERVALS = {
+    "new": 0,               # not in the previous snapshot
+    "active": 0,            # valueTradedToday >= ACTIVE_VALUE_TRADED
+    "normal": 3600,
+    "quiet": 6 * 3600,      # nothing traded today
+    "dormant": 7 * 86400,   # quote unchanged for DORMANT_AFTER
+}
+ACTIVE_VALUE_TRADED = 1_000_000
+DORMANT_AFTER = 5 * 86400
+TIER_ORDER = ["new", "active", "normal", "quiet", "dormant"]
+# Upper bound on instruments fetched per run (None = no cap)
+MAX_REFRESH = None
+# Pause after a failed fetch, doubled for every further failure in a row
+FAILURE_BACKOFF = 300
+FAILURE_BACKOFF_MAX = 6 * 3600
+
+
+# === State ===
+def load_refresh_state(path=REFRESH_STATE_FILE):
+    # {orderBookId: unix time of the last successful fetch}
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {str(k): float(v) for k, v in json.load(f).items()}
+
+
+def save_refresh_state(state, path=REFRESH_STATE_FILE):
+    write_json_atomic(path, state)
+
+
+# === Policy ===
+def quote_age(record, now):
+    # Seconds since the quote last changed (lastUpdated is naive UTC)
+    try:
+        updated = datetime.fromisoformat(record.get("lastUpdated")).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return float("inf")
+    return now - updated.timestamp()
+
+
+def tier(record, now):
+    if record is None:
+        return "new"
+    if quote_age(record, now) >= DORMANT_AFTER:
+        return "dormant"
+    if not record.get("volumeTradedToday"):
+        return "quiet"
+    if (record.get("valueTradedToday") or 0) >= ACTIVE_VALUE_TRADED:
+        return "active"
+    return "normal"
+
+
+def record_failure(failures, order_book_id, now=None):
+    # failures is {orderBookId: [failures in a row, unix time of the last one]}
+    count = failures.get(str(order_book_id), [0, 0])[0] + 1
+    failures[str(order_book_id)] = [count, time.time() if now is None else now]
+
+
+def failure_backoff(count):
+    return min(FAILURE_BACKOFF_MAX, FAILURE_BACKOFF * 2 ** (count - 1))
+
+
+def plan_refresh(companies, previous=None, state=None, now=None, intervals=INTERVALS, max_refresh=MAX_REFRESH,
+                 verbose=True, failures=None):
+    # (todo, carried): the companies to fetch, in priority order, and
+    # {orderBookId: previous record} for everything skipped this run.
+    # `previous` is the last snapshot as a StockTable (or None); `failures`
+    # (see record_failure) holds back instruments that keep failing.
+    now = time.time() if now is None else now
+    state = state or {}
+    failures = failures or {}
+    rows = previous.positions("orderBookId") if previous is not None else {}
+
+    due, carried, counts = [], {}, {name: [0, 0] for name in TIER_ORDER}
+    for company in companies:
+        order_book_id = str(company.get("orderBookId"))
+        record = previous[rows[order_book_id]] if order_book_id in rows else None
+        name = tier(record, now)
+        counts[name][0] += 1
+        last_fetch = state.get(order_book_id)
+        failure = failures.get(order_book_id)
+        if failure and now - failure[1] < failure_backoff(failure[0]):
+            if record is not None:
+                carried[order_book_id] = record
+        elif record is None or last_fetch is None or now - last_fetch >= intervals[name]:
+            # Least recently attempted first, failed attempts included
+            last_attempt = max(last_fetch or 0, failure[1] if failure else 0)
+            value = (record.get("valueTradedToday") or 0) if record is not None else 0
+            due.append((TIER_ORDER.index(name), last_attempt, -value, company, record))
+        else:
+            carried[order_book_id] = record
+
+    due.sort(key=lambda entry: entry[:3])
+    if max_refresh is not None and len(due) > max_refresh:
+        # Over the cap: due instruments with a previous record wait for the next run
+        for _, _, _, company, record in due[max_refresh:]:
+            if record is not None:
+                carried[str(company.get("orderBookId"))] = record
+        due = due[:max_refresh]
+    for rank, _, _, _, _ in due:
+        counts[TIER_ORDER[rank]][1] += 1
+
+    todo = [company for _, _, _, company, _ in due]
+    if verbose:
+        summary = ", ".join(f"{name} {fetch}/{total}" for name, (total, fetch) in counts.items() if total)
+        print(f"🗓 Refresh plan: fetching {len(todo)} of {len(companies)} ({summary}).")
+    return todo, carried
@@ -0,0 +1,52 @@
+# scoring.py
+# Columnar helpers for vectorized scoring. A snapshot is turned into one
+# float64 array per column (missing values become NaN), scores (see
+# ranking.py) are computed on whole arrays, and top-K selection uses
+# argpartition instead of sorting the full universe.
+
+import numpy as np
+
+from stock_model import StockTable
+
+
+# === Columns ===
+def to_columns(records, columns):
+    # {column: float64 array}, None (or a non-numeric value) -> NaN
+    if isinstance(records, StockTable):
+        return {column: records.numeric(column) for column in columns}
+    out = {}
+    for column in columns:
+        values = np.empty(len(records), dtype=np.float64)
+        for i, record in enumerate(records):
+            value = record.get(column)
+            values[i] = value if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+        out[column] = values
+    return out
+
+
+def columns_from_table(table, columns):
+    # Same as to_columns but straight from a pyarrow.Table (read_table)
+    out = {}
+    for column in columns:
+        array = table.column(column).cast("float64")
+        out[column] = array.to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+    return out
+
+
+def to_optional(values):
+    # Back to Python values for writing snapshots: NaN -> None
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+# === Ranking ===
+def top_k(scores, k):
+    # Indices of the k highest scores, best first. NaN never ranks.
+    scores = np.asarray(scores, dtype=np.float64)
+    candidates = np.flatnonzero(~np.isnan(scores))
+    if k <= 0 or candidates.size == 0:
+        return np.empty(0, dtype=np.intp)
+    if candidates.size > k:
+        part = np.argpartition(-scores[candidates], k - 1)[:k]
+        candidates = candidates[part]
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order]
@@ -0,0 +1,256 @@
+# snapshot_store.py
+# Pluggable storage for daily snapshots (stock data, company lists, labeled
+# companies). Snapshots are addressed by a stem such as "avanza_stock_data";
+# the backend decides the file extension. Parquet (typed, columnar) is used
+# when pyarrow is installed, JSON otherwise or on request. iter_snapshot
+# streams records with the filters and column selection applied while
+# reading, so large files are never loaded whole.
+
+import json
+import os
+
+import numpy as np
+
+from record_stream import iter_json_file
+from stock_model import FIELDS as STOCK_FIELDS, FLOAT_FIELDS, INT_FIELDS, MISSING_INT, StockRecord, StockTable
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    ds = None
+    pq = None
+
+# === Configuration ===
+SNAPSHOT_FORMAT = "parquet" if pa is not None else "json"
+# Also write the old indented JSON next to the columnar file
+EXPORT_JSON = False
+
+# Column types for the fields fetch_data produces; other columns are inferred
+if pa is not None:
+    STOCK_SCHEMA = {
+        "name": pa.string(),
+        "orderBookId": pa.string(),
+        "owners": pa.int64(),
+        "marketCap": pa.float64(),
+        "marketCapCurrency": pa.dictionary(pa.int8(), pa.string()),
+        "changePercentToday": pa.float64(),
+        "volumeTradedToday": pa.int64(),
+        "valueTradedToday": pa.float64(),
+        "firstTradingDate": pa.string(),
+        "lastUpdated": pa.string(),
+        "hypePotential": pa.float64(),
+        "ai_company": pa.bool_(),
+        "healthcare_company": pa.bool_(),
+        "description": pa.string(),
+    }
+else:
+    STOCK_SCHEMA = {}
+
+STRING_COLUMNS = {"name", "orderBookId", "marketCapCurrency", "firstTradingDate", "lastUpdated", "description"}
+
+
+# === Filters ===
+# Filters are a list of (column, op, value) tuples that must all hold, the
+# same form pyarrow.parquet.read_table accepts.
+def _match(value, op, operand):
+    if op in ("=", "=="):
+        return value == operand
+    if op == "!=":
+        return value != operand
+    if op == "in":
+        return value in operand
+    if op == "not in":
+        return value not in operand
+    if value is None:
+        return False
+    if op == "<":
+        return value < operand
+    if op == "<=":
+        return value <= operand
+    if op == ">":
+        return value > operand
+    if op == ">=":
+        return value >= operand
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def record_matches(record, filters):
+    return all(_match(record.get(column), op, operand) for column, op, operand in filters)
+
+
+def _project(record, columns):
+    return {c: record.get(c) for c in columns}
+
+
+def _plain(records):
+    # Backends serialize dicts; StockTable / StockRecord rows are converted
+    if isinstance(records, StockTable):
+        return records.to_dicts()
+    return [dict(r) if isinstance(r, StockRecord) else r for r in records]
+
+
+# === Backends ===
+class JsonBackend:
+    extension = ".json"
+
+    def write(self, records, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(_plain(records), f, indent=2, ensure_ascii=False)
+
+    def iter(self, path, columns=None, filters=None):
+        for record in iter_json_file(path):
+            if filters and not record_matches(record, filters):
+                continue
+            yield _project(record, columns) if columns else record
+
+    def read(self, path, columns=None, filters=None):
+        return list(self.iter(path, columns, filters))
+
+
+class JsonLinesBackend(JsonBackend):
+    # One record per line, like the history partitions
+    extension = ".jsonl"
+
+    def write(self, records, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for record in _plain(records):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class ParquetBackend:
+    extension = ".parquet"
+
+    def to_table(self, records):
+        if isinstance(records, StockTable):
+            return self.from_stock_table(records)
+        records = _plain(records)
+        columns = []
+        for record in records:
+            for key in record:
+                if key not in columns:
+                    columns.append(key)
+
+        arrays = []
+        for column in columns:
+            values = [r.get(column) for r in records]
+            if column in STRING_COLUMNS:
+                values = [None if v is None else str(v) for v in values]
+            arrays.append(pa.array(values, type=STOCK_SCHEMA.get(column)))
+        return pa.Table.from_arrays(arrays, names=columns)
+
+    def from_stock_table(self, table):
+        # Numeric columns go straight from the typed arrays, missing values masked
+        arrays, names = [], []
+        for column in STOCK_FIELDS + list(table.extra):
+            if column in FLOAT_FIELDS or column in INT_FIELDS:
+                values = np.frombuffer(table.columns[column], dtype=np.float64 if column in FLOAT_FIELDS else np.int64)
+                mask = np.isnan(values) if column in FLOAT_FIELDS else values == MISSING_INT
+                arrays.append(pa.array(values, mask=mask, type=STOCK_SCHEMA.get(column)))
+            else:
+                arrays.append(pa.array(table.column(column), type=STOCK_SCHEMA.get(column)))
+            names.append(column)
+        return pa.Table.from_arrays(arrays, names=names)
+
+    def write(self, records, path):
+        pq.write_table(self.to_table(records), path, compression="zstd")
+
+    def read_table(self, path, columns=None, filters=None):
+        return pq.read_table(path, columns=columns, filters=_arrow_filters(filters))
+
+    def read(self, path, columns=None, filters=None):
+        return self.read_table(path, columns, filters).to_pylist()
+
+    def iter(self, path, columns=None, filters=None):
+        # Row groups are read one batch at a time with the filter applied
+        dataset = ds.dataset(path, format="parquet")
+        expression = pq.filters_to_expression(_arrow_filters(filters)) if filters else None
+        for batch in dataset.to_batches(columns=columns, filter=expression):
+            yield from batch.to_pylist()
+
+
+def _arrow_filters(filters):
+    if not filters:
+        return None
+    # pyarrow wants lists (not sets) for "in"
+    return [(c, op, list(v) if isinstance(v, (set, frozenset, tuple)) else v) for c, op, v in filters]
+
+
+BACKENDS = {"json": JsonBackend(), "jsonl": JsonLinesBackend()}
+if pa is not None:
+    BACKENDS["parquet"] = ParquetBackend()
+
+
+# === Paths ===
+def _backend_for_path(path):
+    for backend in BACKENDS.values():
+        if path.endswith(backend.extension):
+            return backend
+    return None
+
+
+def resolve_snapshot(stem):
+    # A stem like "avanza_stock_data" resolves to the first existing file,
+    # preferring the configured format. Full paths are returned unchanged.
+    if _backend_for_path(stem):
+        return stem
+    order = [SNAPSHOT_FORMAT] + [name for name in BACKENDS if name != SNAPSHOT_FORMAT]
+    for name in order:
+        path = stem + BACKENDS[name].extension
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No snapshot found for {stem}")
+
+
+# === Public API ===
+def write_snapshot(records, stem, fmt=None, export_json=None):
+    fmt = fmt or SNAPSHOT_FORMAT
+    export_json = EXPORT_JSON if export_json is None else export_json
+    backend = BACKENDS[fmt]
+    path = stem + backend.extension
+
+    # Write to a temp file first so a crash never leaves a half-written file
+    tmp_path = path + ".tmp"
+    backend.write(records, tmp_path)
+    os.replace(tmp_path, path)
+
+    if export_json and fmt != "json":
+        export_snapshot_json(path, stem + ".json")
+    return path
+
+
+def read_snapshot(stem, columns=None, filters=None):
+    path = resolve_snapshot(stem)
+    return _backend_for_path(path).read(path, columns, filters)
+
+
+def iter_snapshot(stem, columns=None, filters=None):
+    # Same as read_snapshot, one record at a time; memory does not grow
+    # with the file size
+    path = resolve_snapshot(stem)
+    return _backend_for_path(path).iter(path, columns, filters)
+
+
+def read_stock_table(stem, columns=None, filters=None):
+    # The snapshot as a compact StockTable (see stock_model), filled while
+    # streaming so no list of dicts is built on the way
+    return StockTable(iter_snapshot(stem, columns, filters))
+
+
+def read_table(stem, columns=None, filters=None):
+    # Columnar access (pyarrow.Table) for fast filtering and scoring
+    if pa is None:
+        raise ImportError("pyarrow is required for read_table")
+    path = resolve_snapshot(stem)
+    backend = _backend_for_path(path)
+    if isinstance(backend, ParquetBackend):
+        return backend.read_table(path, columns, filters)
+    return BACKENDS["parquet"].to_table(backend.read(path, columns, filters))
+
+
+def export_snapshot_json(path, json_path):
+    records = _backend_for_path(path).read(path)
+    BACKENDS["json"].write(records, json_path)
+    return json_path
@@ -0,0 +1,111 @@
+# stock_index.py
+# Query layer over a StockTable for interactive questions such as "listed
+# in the last 90 days with hypePotential above X". firstTradingDate is
+# parsed once into datetime64 and the rows are kept sorted by it, so a date
+# range is a binary search plus a slice. Currency and sector flag columns
+# get one boolean mask per value, numeric columns a float array, both in
+# the same sorted order, so further filters are vectorized over the slice.
+
+from datetime import date, timedelta
+
+import numpy as np
+
+from snapshot_store import record_matches
+from stock_model import FLOAT_FIELDS, INT_FIELDS
+
+DATE_COLUMN = "firstTradingDate"
+# Columns with few distinct values get an equality index
+CATEGORY_COLUMNS = ["marketCapCurrency"]
+NUMERIC_OPS = {
+    "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+    "=": np.equal, "==": np.equal, "!=": np.not_equal,
+}
+
+
+def parse_dates(values):
+    # datetime64[D] array; missing or malformed dates become NaT
+    try:
+        return np.array(values, dtype="datetime64[D]")
+    except ValueError:
+        out = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[D]")
+        for i, value in enumerate(values):
+            try:
+                out[i] = np.datetime64(value, "D")
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+class StockIndex:
+    def __init__(self, table, date_column=DATE_COLUMN):
+        self.table = table
+        dates = parse_dates(table.column(date_column))
+        # NaT sorts last, so dated rows form one sorted prefix
+        self.order = np.argsort(dates, kind="stable")
+        self.dates = dates[self.order]
+        self.dated = int(np.count_nonzero(~np.isnat(self.dates)))
+
+        self.categories = {}
+        for column in CATEGORY_COLUMNS + [c for c in table.extra if c.endswith("_company")]:
+            if column in table:
+                values = np.array(table.column(column), dtype=object)[self.order]
+                self.categories[column] = {
+                    value: values == value for value in set(values.tolist()) if value is not None
+                }
+        self.numeric = {}
+
+    def _numeric(self, column):
+        # Sorted float column, built on first use
+        if column not in self.numeric:
+            self.numeric[column] = self.table.numeric(column)[self.order]
+        return self.numeric[column]
+
+    def _range(self, start, end):
+        # Positions [lo, hi) in date order with start <= date <= end; with
+        # no bounds at all every row, undated ones included
+        if start is None and end is None:
+            return 0, len(self.order)
+        dates = self.dates[:self.dated]
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, "D"), side="left"))
+        hi = self.dated if end is None else int(np.searchsorted(dates, np.datetime64(end, "D"), side="right"))
+        return lo, max(lo, hi)
+
+    def _mask(self, column, op, operand, lo, hi):
+        categories = self.categories.get(column)
+        if categories is not None and op in ("=", "==", "in"):
+            wanted = operand if op == "in" else [operand]
+            mask = np.zeros(hi - lo, dtype=bool)
+            for value in wanted:
+                if value in categories:
+                    mask |= categories[value][lo:hi]
+            return mask
+        if (column in FLOAT_FIELDS or column in INT_FIELDS) and op in NUMERIC_OPS:
+            # NaN compares False, like None in snapshot filters
+            return NUMERIC_OPS[op](self._numeric(column)[lo:hi], operand)
+        rows = self.order[lo:hi]
+        return np.array([record_matches({column: self.table.value(column, i)}, [(column, op, operand)]) for i in rows],
+                        dtype=bool)
+
+    # === Queries ===
+    def query(self, start=None, end=None, filters=()):
+        # Table rows (date order) listed between start and end (inclusive,
+        # ISO strings or dates; None leaves that side open) that pass all
+        # (column, op, value) filters. Without start and end, rows with no
+        # valid firstTradingDate are included too.
+        lo, hi = self._range(start, end)
+        mask = np.ones(hi - lo, dtype=bool)
+        for column, op, operand in filters:
+            mask &= self._mask(column, op, operand, lo, hi)
+        return self.order[lo:hi][mask]
+
+    def listed_within(self, days, filters=(), today=None):
+        # Rows first traded at most `days` ago (announced listings included)
+        today = today or date.today()
+        return self.query(start=today - timedelta(days=days), filters=filters)
+
+    def select(self, rows):
+        return self.table.take(rows)
+
+    def count(self, start=None, end=None):
+        lo, hi = self._range(start, end)
+        return hi - lo
@@ -0,0 +1,235 @@
+# stock_model.py
+# Compact in-memory model for stock snapshots. StockRecord is a slotted
+# record for a single company; StockTable holds a whole universe column by
+# column: numeric fields in typed arrays (NaN or MISSING_INT for missing
+# values), string fields interned so repeated names, currencies and dates
+# share one object, and extra columns (sector flags, description, date) as
+# plain lists. Both keep the dict-style access (record["name"], .get) the
+# scripts already use, so one row costs a few machine words per field
+# instead of a dict with 11 string keys.
+
+import math
+import sys
+from array import array
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# === Schema ===
+# The fields fetch_data produces, in snapshot order
+FIELDS = [
+    "name", "orderBookId", "owners", "marketCap", "marketCapCurrency",
+    "changePercentToday", "volumeTradedToday", "valueTradedToday",
+    "firstTradingDate", "lastUpdated", "hypePotential",
+]
+FLOAT_FIELDS = {"marketCap", "changePercentToday", "valueTradedToday", "hypePotential"}
+INT_FIELDS = {"owners", "volumeTradedToday"}
+STRING_FIELDS = {"name", "orderBookId", "marketCapCurrency", "firstTradingDate", "lastUpdated"}
+STOCK_FIELD_SET = frozenset(FIELDS)
+MISSING_INT = -2 ** 63
+# Shorter extra strings (flags, currencies, dates) are interned; long ones
+# such as descriptions are unique anyway
+INTERN_MAX_LENGTH = 64
+
+
+def _string(value):
+    return None if value is None else sys.intern(str(value))
+
+
+def _float(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else math.nan
+
+
+def _int(value):
+    return int(value) if isinstance(value, (int, float)) and not isinstance(value, bool) and value == value else MISSING_INT
+
+
+# === Single record ===
+class StockRecord(MutableMapping):
+    # One snapshot row; the core fields are slots, anything else (sector
+    # flags, description, ...) goes to a small dict created on first use
+    __slots__ = FIELDS + ["extra"]
+
+    def __init__(self, **fields):
+        for field in FIELDS:
+            value = fields.pop(field, None)
+            setattr(self, field, _string(value) if field in STRING_FIELDS else value)
+        self.extra = fields or None
+
+    @classmethod
+    def from_dict(cls, record):
+        return record if isinstance(record, cls) else cls(**record)
+
+    def to_dict(self):
+        return dict(self)
+
+    def __getitem__(self, key):
+        if key in STOCK_FIELD_SET:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in STOCK_FIELD_SET:
+            setattr(self, key, _string(value) if key in STRING_FIELDS else value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in STOCK_FIELD_SET:
+            setattr(self, key, None)
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        yield from FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return len(FIELDS) + len(self.extra or ())
+
+    def __repr__(self):
+        return f"StockRecord({dict(self)!r})"
+
+
+# === Whole universe ===
+class StockTable:
+    # Column-wise snapshot. Rows are appended as dicts or StockRecords;
+    # table[i] returns a StockRecord copy, so changes to a table go through
+    # set / set_column.
+    def __init__(self, records=()):
+        self.columns = {}
+        for field in FIELDS:
+            if field in FLOAT_FIELDS:
+                self.columns[field] = array("d")
+            elif field in INT_FIELDS:
+                self.columns[field] = array("q")
+            else:
+                self.columns[field] = []
+        self.extra = {}
+        self.size = 0
+        for record in records:
+            self.append(record)
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(records)
+
+    def __len__(self):
+        return self.size
+
+    # === Rows ===
+    def append(self, record):
+        for field in FIELDS:
+            value = record.get(field)
+            if field in FLOAT_FIELDS:
+                self.columns[field].append(_float(value))
+            elif field in INT_FIELDS:
+                self.columns[field].append(_int(value))
+            else:
+                self.columns[field].append(_string(value))
+        for key in record:
+            if key not in STOCK_FIELD_SET and key not in self.extra:
+                self.extra[key] = [None] * self.size
+        for key, values in self.extra.items():
+            value = record.get(key)
+            values.append(sys.intern(value) if isinstance(value, str) and len(value) < INTERN_MAX_LENGTH else value)
+        self.size += 1
+
+    def value(self, column, i):
+        if column in self.extra:
+            return self.extra[column][i]
+        value = self.columns[column][i]
+        if column in FLOAT_FIELDS:
+            return None if value != value else value
+        if column in INT_FIELDS:
+            return None if value == MISSING_INT else value
+        return value
+
+    def set(self, i, column, value):
+        self.set_column(column, [value], rows=[i])
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("StockTable index out of range")
+        record = StockRecord(**{field: self.value(field, i) for field in FIELDS})
+        for key, values in self.extra.items():
+            record[key] = values[i]
+        return record
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self[i]
+
+    def to_dicts(self):
+        columns = [(field, self.column(field)) for field in FIELDS] + list(self.extra.items())
+        return [{name: values[i] for name, values in columns} for i in range(self.size)]
+
+    # === Columns ===
+    def __contains__(self, column):
+        return column in self.columns or column in self.extra
+
+    def column(self, name):
+        # Python values of one column, None for missing
+        return [self.value(name, i) for i in range(self.size)]
+
+    def numeric(self, name):
+        # float64 array of one column, NaN for missing or non-numeric values
+        if name in FLOAT_FIELDS:
+            return np.frombuffer(self.columns[name], dtype=np.float64).copy()
+        if name in INT_FIELDS:
+            values = np.frombuffer(self.columns[name], dtype=np.int64)
+            out = values.astype(np.float64)
+            out[values == MISSING_INT] = np.nan
+            return out
+        if name in self.extra:
+            return np.array([_float(v) for v in self.extra[name]], dtype=np.float64)
+        return np.full(self.size, np.nan)
+
+    def set_column(self, name, values, rows=None):
+        # Replace a whole column, or only the given rows of it. New names
+        # become extra columns.
+        if rows is None and name in FLOAT_FIELDS and isinstance(values, np.ndarray):
+            # Whole float column from a score array: one buffer copy
+            column = array("d")
+            column.frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+            self.columns[name] = column
+            return
+        rows = range(self.size) if rows is None else rows
+        if name in FLOAT_FIELDS or name in INT_FIELDS:
+            convert = _float if name in FLOAT_FIELDS else _int
+            column = self.columns[name]
+            for i, value in zip(rows, values):
+                column[i] = convert(value.item() if isinstance(value, np.generic) else value)
+            return
+        if name in STRING_FIELDS:
+            column = self.columns[name]
+            values = [_string(v) for v in values]
+        else:
+            column = self.extra.setdefault(name, [None] * self.size)
+        for i, value in zip(rows, values):
+            column[i] = value
+
+    def take(self, indices):
+        # New table with the given rows, in that order
+        indices = list(indices)
+        out = StockTable()
+        for field in FIELDS:
+            source = self.columns[field]
+            out.columns[field] = (array(source.typecode, (source[i] for i in indices))
+                                  if isinstance(source, array) else [source[i] for i in indices])
+        out.extra = {key: [values[i] for i in indices] for key, values in self.extra.items()}
+        out.size = len(indices)
+        return out
+
+    def positions(self, column="orderBookId"):
+        # {value: row} for a key column
+        return {value: i for i, value in enumerate(self.column(column))}
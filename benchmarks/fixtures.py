@@ -0,0 +1,284 @@
+# fixtures.py
+# Recorded inputs for the benchmark suite and an offline replay of the
+# services behind them. A fixture set is a directory of JSON files:
+#   companies.json          [{name, orderBookId}]
+#   stock_list_pages.json   market-stock-filter responses, by offset
+#   stock_info.json         {orderBookId: get_stock_info response}
+#   descriptions.json       {orderBookId: {"api": market-guide JSON or null, "html": page or null}}
+#   llm_answers.json        {"sectors": ..., "answers": {orderBookId: {sector: bool}}, "seconds_per_item": ...}
+#   stock_data.json         parsed stock snapshot records (input to the plot stage)
+# record_live captures a set from Avanza and Ollama; synthesize builds one
+# offline from the committed company list, for machines without access.
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(ROOT, "Base_scripts"))
+sys.path.append(os.path.join(ROOT, "AI_scripts"))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+COMPANY_LIST = os.path.join(ROOT, "Base_scripts", "avanza_all_companies1.json")
+FIXTURE_FILES = ["companies", "stock_list_pages", "stock_info", "descriptions", "llm_answers", "stock_data"]
+
+STOCK_LIST_PATH = "/_api/market-stock-filter/"
+DESCRIPTION_PATH = "/_api/market-guide/stock/{}"
+PAGE_PATH = "/aktier/om-aktien.html/{}"
+LLM_PATH = "/api/generate"
+
+
+# === Files ===
+def save_fixtures(fixtures, path=FIXTURES_DIR):
+    os.makedirs(path, exist_ok=True)
+    for name in FIXTURE_FILES:
+        with open(os.path.join(path, name + ".json"), "w", encoding="utf-8") as f:
+            json.dump(fixtures[name], f, ensure_ascii=False)
+    return path
+
+
+def load_fixtures(path=FIXTURES_DIR):
+    fixtures = {}
+    for name in FIXTURE_FILES:
+        with open(os.path.join(path, name + ".json"), "r", encoding="utf-8") as f:
+            fixtures[name] = json.load(f)
+    return fixtures
+
+
+def fixtures_exist(path=FIXTURES_DIR):
+    return all(os.path.exists(os.path.join(path, name + ".json")) for name in FIXTURE_FILES)
+
+
+# === Replay ===
+class FakeAvanza:
+    # Stands in for avanza.Avanza in fetch_data; get_stock_info answers from
+    # the recorded responses after `delay` seconds
+    def __init__(self, stock_info, delay=0.0):
+        self.stock_info = stock_info
+        self.delay = delay
+
+    def get_stock_info(self, order_book_id):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.stock_info[str(order_book_id)]
+
+
+class _ReplayHTTPServer(ThreadingHTTPServer):
+    # Description scraping opens up to MAX_CONCURRENCY connections at once
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class FixtureServer:
+    # Local HTTP server replaying the stock list API, the market-guide API,
+    # the company pages and Ollama's /api/generate from a fixture set.
+    # llm_delay scales the recorded LLM time per item (0 answers at once).
+    def __init__(self, fixtures, llm_delay=0.0):
+        self.fixtures = fixtures
+        self.llm_delay = llm_delay
+        self.pages = {page["offset"]: page["response"] for page in fixtures["stock_list_pages"]}
+        handler = type("Handler", (_ReplayHandler,), {"replay": self})
+        self.server = _ReplayHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stock_list(self, payload):
+        return self.pages.get(payload.get("offset", 0), {"stocks": []})
+
+    def llm_reply(self, payload):
+        # Answer every orderBookId listed in the prompt ("id | name: text")
+        ids = re.findall(r"^(\S+) \| ", payload.get("prompt", ""), re.MULTILINE)
+        llm = self.fixtures["llm_answers"]
+        answers = {i: llm["answers"][i] for i in ids if i in llm["answers"]}
+        if self.llm_delay:
+            time.sleep(self.llm_delay * llm.get("seconds_per_item", 0) * len(ids))
+        return {"model": payload.get("model"), "response": json.dumps(answers), "done": True}
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffered, so headers and body leave in one packet (no delayed-ACK stalls)
+    wbufsize = -1
+    replay = None
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, body=b"", content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8") if content_type == "application/json" else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == STOCK_LIST_PATH:
+            self.send(200, self.replay.stock_list(payload))
+        elif self.path == LLM_PATH:
+            self.send(200, self.replay.llm_reply(payload))
+        else:
+            self.send(404)
+
+    def do_GET(self):
+        descriptions = self.replay.fixtures["descriptions"]
+        order_book_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+        recorded = descriptions.get(order_book_id) or {}
+        if self.path == DESCRIPTION_PATH.format(order_book_id) and recorded.get("api") is not None:
+            self.send(200, recorded["api"])
+        elif self.path == PAGE_PATH.format(order_book_id) and recorded.get("html") is not None:
+            self.send(200, recorded["html"], "text/html; charset=utf-8")
+        else:
+            self.send(404)
+
+
+# === Synthetic fixtures ===
+WORDS = ("software platform cloud data analytics medical devices diagnostics defense systems "
+         "mining energy retail banking insurance logistics gaming biotech vaccines sensors").split()
+
+
+def synthesize(n=500, seed=0, page_size=100, source=COMPANY_LIST):
+    # A fixture set for the first n companies of the committed company list,
+    # with seeded random quotes, descriptions and LLM answers
+    from sector_classifier import SECTORS
+
+    rng = random.Random(seed)
+    with open(source, "r", encoding="utf-8") as f:
+        companies = [{"name": c["name"], "orderBookId": str(c["orderBookId"])} for c in json.load(f)[:n]]
+
+    pages = []
+    for offset in range(0, len(companies), page_size):
+        chunk = companies[offset:offset + page_size]
+        pages.append({"offset": offset, "limit": page_size, "response": {
+            "stocks": [{"orderbookId": c["orderBookId"], "name": c["name"]} for c in chunk],
+            "totalNumberOfOrderbooks": len(companies),
+        }})
+
+    stock_info, descriptions, answers, stock_data = {}, {}, {}, []
+    for i, company in enumerate(companies):
+        order_book_id = company["orderBookId"]
+        owners = rng.randint(10, 200000)
+        market_cap = rng.uniform(1e6, 1e11)
+        currency = rng.choice(["SEK", "SEK", "USD", "EUR", "NOK"])
+        change = round(rng.uniform(-8, 8), 2)
+        volume = rng.randint(0, 5_000_000)
+        value = volume * rng.uniform(1, 300)
+        updated = int(time.time() * 1000) - rng.randint(0, 30 * 86400) * 1000
+        start = f"{rng.randint(1990, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        stock_info[order_book_id] = {
+            "keyIndicators": {"numberOfOwners": owners,
+                              "marketCapital": {"value": market_cap, "currency": currency}},
+            "quote": {"changePercent": change, "totalVolumeTraded": volume,
+                      "totalValueTraded": value, "updated": updated},
+            "historicalClosingPrices": {"startDate": start},
+        }
+        stock_data.append({
+            "name": company["name"], "orderBookId": order_book_id, "owners": owners,
+            "marketCap": market_cap, "marketCapCurrency": currency, "changePercentToday": change,
+            "volumeTradedToday": volume, "valueTradedToday": value, "firstTradingDate": start,
+            "lastUpdated": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(updated / 1000)),
+            "hypePotential": market_cap / owners * value,
+        })
+
+        text = f"{company['name']} is a company working with " + " ".join(rng.choices(WORDS, k=rng.randint(15, 80))) + "."
+        # Half the companies only have the description on the HTML page
+        if i % 2:
+            descriptions[order_book_id] = {"api": {"company": {"description": text}}, "html": None}
+        else:
+            descriptions[order_book_id] = {"api": None, "html": (
+                "<html><head><title>" + company["name"] + "</title></head><body>"
+                + "<nav>" + "<a href='#'>menu</a>" * 50 + "</nav>"
+                + f"<p class='separation'>{text}</p></body></html>")}
+        answers[order_book_id] = {sector: rng.random() < 0.1 for sector in SECTORS}
+
+    return {
+        "companies": companies,
+        "stock_list_pages": pages,
+        "stock_info": stock_info,
+        "descriptions": descriptions,
+        "llm_answers": {"sectors": SECTORS, "answers": answers, "seconds_per_item": 0.05},
+        "stock_data": stock_data,
+    }
+
+
+# === Live recording ===
+def record_live(n=500):
+    # Record a fixture set from Avanza and the local Ollama for the first n
+    # companies. Needs network access, credentials in fetch_avanza_data and
+    # a running Ollama.
+    import requests
+    import description_fetcher
+    import fetch_avanza_data
+    import get_avanza_company_names_and_orderID as discovery
+    import sector_classifier
+    from ranking import apply_hype_potential
+
+    session = requests.Session()
+    pages = []
+    post = session.post
+
+    def recording_post(url, json=None, **kwargs):
+        response = post(url, json=json, **kwargs)
+        pages.append({"offset": json["offset"], "limit": json["limit"], "response": response.json()})
+        return response
+
+    session.post = recording_post
+    companies = discovery.discover_api(session)[:n]
+    pages = [page for page in pages if page["offset"] < n]
+
+    client = fetch_avanza_data.create_client()
+    stock_info = {c["orderBookId"]: client.get_stock_info(c["orderBookId"]) for c in companies}
+    stock_data = [fetch_avanza_data.parse_stock_info(c, stock_info[c["orderBookId"]]) for c in companies]
+    apply_hype_potential(stock_data)
+
+    web = description_fetcher.create_session(8)
+    descriptions, texts = {}, {}
+    for company in companies:
+        order_book_id = company["orderBookId"]
+        api = web.get(description_fetcher.DESCRIPTION_API.format(order_book_id), timeout=15)
+        api_json = api.json() if api.status_code == 200 else None
+        text = description_fetcher.extract_from_api(api_json)
+        html = None
+        if not text:
+            page = web.get(description_fetcher.PAGE_URL.format(order_book_id), timeout=15)
+            html = page.text if page.status_code == 200 else None
+            text = description_fetcher.extract_from_html(html) if html else ""
+        # Companies without an HTTP description would send the replay into
+        # the Selenium fallback, so they are left out
+        if text:
+            descriptions[order_book_id] = {"api": api_json if not html else None, "html": html}
+            texts[order_book_id] = text
+
+    names = {c["orderBookId"]: c["name"] for c in companies}
+    start = time.perf_counter()
+    answers = sector_classifier.classify_with_ollama(texts, names=names, use_embeddings=False)
+    seconds_per_item = (time.perf_counter() - start) / max(len(texts), 1)
+
+    return {
+        "companies": companies,
+        "stock_list_pages": pages,
+        "stock_info": stock_info,
+        "descriptions": descriptions,
+        "llm_answers": {"sectors": sector_classifier.SECTORS, "answers": answers,
+                        "seconds_per_item": seconds_per_item},
+        "stock_data": stock_data,
+    }
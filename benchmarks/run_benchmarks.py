@@ -0,0 +1,319 @@
+# run_benchmarks.py
+# Per-stage benchmarks for the pipeline, fully offline. Each stage runs the
+# real code against a fixture set (see fixtures.py): discovery and
+# description scraping talk to a local replay server, the quote fetch gets a
+# fake Avanza client, classification gets replayed LLM answers. Every stage
+# runs in its own process so peak RSS is per stage, and every repeat starts
+# in an empty working directory so caches are cold.
+# Results go to results/<time>-<git revision>.json and are compared with the
+# previous run; slower throughput, higher p95 or higher peak RSS beyond
+# REGRESSION_TOLERANCE is reported as a regression.
+# To run: `python run_benchmarks.py` (`--synthesize 2000` to build fixtures,
+# `--record 500` to record them live)
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+from fixtures import (FIXTURES_DIR, ROOT, DESCRIPTION_PATH, LLM_PATH, PAGE_PATH, STOCK_LIST_PATH,
+                      FakeAvanza, FixtureServer, fixtures_exist, load_fixtures, record_live,
+                      save_fixtures, synthesize)
+
+# === Configuration ===
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+STAGES = ["discovery", "quote_fetch", "description_scrape", "llm_classification", "plot"]
+REPEAT = 5
+REGRESSION_TOLERANCE = 0.10   # relative change before a metric counts as regressed
+SYNTHETIC_COMPANIES = 500
+
+
+# === Measurement helpers ===
+def timed(fn, samples):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+def timed_async(fn, samples):
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+# === Stages ===
+# Each stage runs the pipeline step once in the current directory, appends
+# one latency sample per unit of work (request, instrument, batch, plot) to
+# `samples` and returns the number of items processed.
+def stage_discovery(fixtures, server, samples, options):
+    import requests
+    import get_avanza_company_names_and_orderID as discovery
+
+    discovery.STOCK_LIST_API = server.url + STOCK_LIST_PATH
+    session = requests.Session()
+    session.post = timed(session.post, samples)
+    try:
+        companies = discovery.discover_api(session, page_size=fixtures["stock_list_pages"][0]["limit"])
+    finally:
+        session.close()
+    return len(companies)
+
+
+def stage_quote_fetch(fixtures, server, samples, options):
+    import fetch_avanza_data
+    from snapshot_store import write_snapshot
+
+    write_snapshot(fixtures["companies"], fetch_avanza_data.INPUT_SNAPSHOT)
+    client = FakeAvanza(fixtures["stock_info"], options.quote_delay)
+    client.get_stock_info = timed(client.get_stock_info, samples)
+    fetch_avanza_data.fetch_data(avanza=client, requests_per_second=options.requests_per_second, resume=False)
+    return len(fixtures["companies"])
+
+
+def stage_description_scrape(fixtures, server, samples, options):
+    import description_fetcher
+    from sector_classifier import parallel_scrape
+
+    description_fetcher.DESCRIPTION_API = server.url + DESCRIPTION_PATH
+    description_fetcher.PAGE_URL = server.url + PAGE_PATH
+    # Time per company, including the wait for a free connection
+    description_fetcher._fetch_one = timed(description_fetcher._fetch_one, samples)
+    description_fetcher._fetch_one_async = timed_async(description_fetcher._fetch_one_async, samples)
+    data = [c for c in fixtures["companies"] if c["orderBookId"] in fixtures["descriptions"]]
+    descriptions, _ = parallel_scrape(data)
+    return len(descriptions)
+
+
+def stage_llm_classification(fixtures, server, samples, options):
+    import sector_classifier
+    from description_fetcher import extract_from_api, extract_from_html
+
+    sector_classifier.OLLAMA_URL = server.url + LLM_PATH
+    sector_classifier.call_ollama = timed(sector_classifier.call_ollama, samples)
+    texts = {}
+    for order_book_id, recorded in fixtures["descriptions"].items():
+        text = extract_from_api(recorded["api"]) if recorded["api"] is not None else ""
+        texts[order_book_id] = text or extract_from_html(recorded["html"] or "")
+    names = {c["orderBookId"]: c["name"] for c in fixtures["companies"]}
+    labels = sector_classifier.classify_with_ollama(
+        texts, fixtures["llm_answers"]["sectors"], names, use_embeddings=False)
+    return len(labels)
+
+
+def stage_plot(fixtures, server, samples, options):
+    import plot_top_hype_potential
+    import matplotlib.pyplot as plt
+    from snapshot_store import write_snapshot
+
+    answers = fixtures["llm_answers"]["answers"]
+    records = [dict(r, healthcare_company=bool((answers.get(r["orderBookId"]) or {}).get("healthcare")))
+               for r in fixtures["stock_data"]]
+    write_snapshot(records, plot_top_hype_potential.INPUT_SNAPSHOT)
+    timed(plot_top_hype_potential.main, samples)()
+    plt.close("all")
+    return len(records)
+
+
+STAGE_FUNCTIONS = {
+    "discovery": stage_discovery,
+    "quote_fetch": stage_quote_fetch,
+    "description_scrape": stage_description_scrape,
+    "llm_classification": stage_llm_classification,
+    "plot": stage_plot,
+}
+
+
+# === Runner ===
+def run_stage(name, fixtures_dir, repeat, options):
+    # Runs in a fresh process (see benchmark); returns the stage statistics
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    warnings.simplefilter("ignore")
+    fixtures = load_fixtures(fixtures_dir)
+    baseline_rss = peak_rss_mb()
+    samples, run_times, items = [], [], 0
+    output = sys.stdout if options.verbose else io.StringIO()
+    cwd = os.getcwd()
+
+    try:
+        with FixtureServer(fixtures, options.llm_delay) as server, contextlib.redirect_stdout(output):
+            for _ in range(repeat):
+                with tempfile.TemporaryDirectory() as workdir:
+                    os.chdir(workdir)
+                    try:
+                        start = time.perf_counter()
+                        items = STAGE_FUNCTIONS[name](fixtures, server, samples, options)
+                        run_times.append(time.perf_counter() - start)
+                    finally:
+                        os.chdir(cwd)
+    except ImportError as e:
+        return {"skipped": f"missing dependency: {e.name}"}
+
+    median_run = percentile(run_times, 50)
+    return {
+        "items": items,
+        "runs": len(run_times),
+        "run_seconds_p50": median_run,
+        "throughput_per_s": items / median_run if median_run else None,
+        "latency_p50_ms": _ms(percentile(samples, 50)),
+        "latency_p95_ms": _ms(percentile(samples, 95)),
+        "latency_samples": len(samples),
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _ms(seconds):
+    return seconds * 1000 if seconds is not None else None
+
+
+def benchmark(stages=STAGES, fixtures_dir=FIXTURES_DIR, repeat=REPEAT, options=None):
+    options = options or parse_args([])
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in stages:
+        print(f"⏱ {name} ...", flush=True)
+        with context.Pool(1) as pool:
+            try:
+                results[name] = pool.apply(run_stage, (name, fixtures_dir, repeat, options))
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+    return results
+
+
+# === Results ===
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(stages, fixtures, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    revision = git_revision()
+    result = {
+        "revision": revision,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "companies": len(fixtures["companies"]),
+        "stages": stages,
+    }
+    path = os.path.join(results_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{revision}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def previous_result(results_dir=RESULTS_DIR, exclude=None):
+    paths = sorted(p for p in glob.glob(os.path.join(results_dir, "*.json")) if p != exclude)
+    if not paths:
+        return None
+    with open(paths[-1], "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def regressions(current, previous, tolerance=REGRESSION_TOLERANCE):
+    # ["stage: metric old -> new"] for every metric that got worse by more
+    # than tolerance; higher throughput is better, everything else lower
+    found = []
+    for name, stats in current.items():
+        old = previous.get(name) or {}
+        for metric, higher_is_better in [("throughput_per_s", True), ("latency_p95_ms", False), ("peak_rss_mb", False)]:
+            before, after = old.get(metric), stats.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (-change if higher_is_better else change) > tolerance:
+                found.append(f"{name}: {metric} {before:.4g} -> {after:.4g} ({change:+.0%})")
+    return found
+
+
+def print_table(stages):
+    print(f"\n{'stage':<20}{'items':>8}{'items/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'peak MB':>10}")
+    for name, stats in stages.items():
+        if "items" not in stats:
+            print(f"{name:<20}  {stats.get('skipped') or stats.get('error')}")
+            continue
+        print(f"{name:<20}{stats['items']:>8}{stats['throughput_per_s'] or 0:>12.1f}"
+              f"{stats['latency_p50_ms'] or 0:>10.2f}{stats['latency_p95_ms'] or 0:>10.2f}{stats['peak_rss_mb']:>10.1f}")
+
+
+# === CLI ===
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline per-stage benchmarks for the pipeline.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--synthesize", type=int, metavar="N", help="build a synthetic fixture set of N companies first")
+    parser.add_argument("--record", type=int, metavar="N", help="record a fixture set of N companies live first")
+    parser.add_argument("--llm-delay", type=float, default=0.0,
+                        help="replay the recorded LLM time per item, scaled by this factor")
+    parser.add_argument("--quote-delay", type=float, default=0.0, help="seconds per fake get_stock_info call")
+    parser.add_argument("--requests-per-second", type=float, default=1e6, help="token bucket rate for the quote fetch")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show the output of the stages")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    if options.record:
+        save_fixtures(record_live(options.record), options.fixtures)
+    elif options.synthesize or not fixtures_exist(options.fixtures):
+        save_fixtures(synthesize(options.synthesize or SYNTHETIC_COMPANIES), options.fixtures)
+    fixtures = load_fixtures(options.fixtures)
+    print(f"📦 Benchmarking {len(fixtures['companies'])} companies, {options.repeat} runs per stage.")
+
+    stages = benchmark(options.stages, options.fixtures, options.repeat, options)
+    print_table(stages)
+
+    path = save_results(stages, fixtures)
+    previous = previous_result(exclude=path)
+    print(f"\n💾 Results saved to {path}")
+    if previous is None:
+        return 0
+    found = regressions(stages, previous["stages"])
+    if previous.get("companies") != len(fixtures["companies"]):
+        print("⚠️ The previous run used a different fixture set; comparison is approximate.")
+    for line in found:
+        print(f"🐢 Regression since {previous['revision']}: {line}")
+    if not found:
+        print(f"✅ No regressions since {previous['revision']}.")
+    return 1 if found and options.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+# The scripts import each other by module name, as when run from their own
+# folder
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(ROOT, "Base_scripts"))
+sys.path.append(os.path.join(ROOT, "AI_scripts"))
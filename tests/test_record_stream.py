@@ -0,0 +1,41 @@
+import io
+import json
+
+import pytest
+
+from record_stream import iter_json_array, iter_json_file
+
+SOURCE = '[1.5e10, -3, 0, true, null, "a,]b", {"name": "x", "values": [1, 2.25]}, [], 12345678901234567890]'
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64])
+def test_elements_split_across_chunks(chunk_size):
+    assert list(iter_json_array(io.StringIO(SOURCE), chunk_size)) == json.loads(SOURCE)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 5])
+def test_number_split_at_chunk_boundary(chunk_size):
+    assert list(iter_json_array(io.StringIO("[1.5e10]"), chunk_size)) == [1.5e10]
+
+
+@pytest.mark.parametrize("source", ["[]", "  [ ]  ", "[\n]\n"])
+def test_empty_array(source):
+    assert list(iter_json_array(io.StringIO(source), 1)) == []
+
+
+@pytest.mark.parametrize("source", ["[1 2]", "[1,]", "[1,,2]", "[1.5x, 2]", '["a" "b"]', "[tru]", "[1", "[", "", "{}"])
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_malformed_input_raises(source, chunk_size):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(source), chunk_size))
+
+
+def test_json_file_formats(tmp_path):
+    records = [{"orderBookId": "1", "owners": 10}, {"orderBookId": "2", "owners": None}]
+    array_path = tmp_path / "snapshot.json"
+    array_path.write_text(json.dumps(records, indent=2), encoding="utf-8")
+    lines_path = tmp_path / "snapshot.jsonl"
+    lines_path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+    assert list(iter_json_file(str(array_path), chunk_size=4)) == records
+    assert list(iter_json_file(str(lines_path))) == records
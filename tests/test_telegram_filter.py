@@ -0,0 +1,39 @@
+import pytest
+
+from news_crawler import match_telegram
+from telegram_filter import TelegramFilter
+
+NAVIGATION = "<nav>Köp aktier, Sälj fonder, Shareholders, Household</nav><script>buyButton()</script>"
+
+
+def page(headline, text=""):
+    return (f"<html>{NAVIGATION}<div class=\"telegram-page__headline\">{headline}</div>"
+            f"<div class=\"telegram-page__text\">{text}</div></html>").encode("utf-8")
+
+
+@pytest.mark.parametrize("headline", [
+    "Nordea uppgraderar Volvo",
+    "SEB nedgraderar H&M",
+    "Riktkursen sänks för Ericsson",
+    "Carnegie upprepar rekommendationen",
+    "DNB: Köprekommendation för SKF",
+    "Analytiker höjer riktkursen till 250 kronor",
+    "Jefferies upgrades Volvo to Buy",
+    "Morgan Stanley cuts price target",
+    "Analyst holds rating at overweight",
+])
+def test_recommendation_headlines_match(headline):
+    assert match_telegram(page(headline), TelegramFilter())
+
+
+@pytest.mark.parametrize("headline", [
+    "Bolaget redovisar rapport för tredje kvartalet",
+    "Household goods maker sees shareholders approve buyback",
+    "Holdingbolaget byter vd",
+])
+def test_unrelated_headlines_do_not_match(headline):
+    assert match_telegram(page(headline), TelegramFilter()) is None
+
+
+def test_navigation_alone_does_not_match():
+    assert match_telegram(NAVIGATION.encode("utf-8"), TelegramFilter()) is None